@@ -0,0 +1,218 @@
+"""
+Métriques d'erreur des prédictions (MAE, RMSE, R², MAPE, sMAPE, biais)
+calculées en une passe, sans scikit-learn.
+
+Un ErrorAccumulator ne garde que quelques sommes par horizon : il se met à
+jour morceau par morceau et se fusionne avec un autre (morceaux d'un
+fichier, chaînes d'un backtest, segments). La variance de y_true, dont
+dépend le R², est cumulée avec l'algorithme de Chan et al. (moyenne et
+somme des carrés des écarts à la moyenne de chaque morceau) : la formule
+naïve sum(y²) - n·moyenne² perd toute précision quand les ventes sont
+grandes devant leur dispersion.
+
+Conventions : erreur = prédiction - réel (biais positif : surestimation) ;
+les jours sans vente sont exclus du MAPE, ceux où réel et prédiction sont
+nuls du sMAPE ; les paires contenant NaN sont ignorées.
+"""
+import numpy as np
+
+METRIC_NAMES = ("MAE", "RMSE", "R2", "MAPE", "sMAPE", "Bias")
+
+# Taille des blocs traités d'un coup : les tableaux intermédiaires (64 Ko)
+# restent sous le seuil mmap de l'allocateur et dans le cache du processeur
+BLOCK_ROWS = 8192
+
+_SUMS = ("abs_error", "squared_error", "error", "ape", "ape_count", "sape", "sape_count")
+
+
+class ErrorAccumulator:
+    """
+    Sommes suffisantes des métriques d'erreur, pour `horizons` horizons
+    (1 pour une série simple)
+    """
+
+    def __init__(self, horizons=1):
+        self.horizons = horizons
+        self.count = np.zeros(horizons, dtype=np.int64)
+        self.mean = np.zeros(horizons)  # moyenne de y_true
+        self.m2 = np.zeros(horizons)  # somme des carrés des écarts de y_true à sa moyenne
+        for name in _SUMS:
+            setattr(self, name, np.zeros(horizons))
+
+    def _totals(self, values, horizon):
+        if horizon is None:
+            # Somme par paires de NumPy, plus précise qu'un cumul séquentiel
+            return np.array([values.sum()])
+        return np.bincount(horizon, weights=values, minlength=self.horizons)
+
+    def _squares(self, values, horizon):
+        if horizon is None:
+            # Produit scalaire : pas de tableau intermédiaire des carrés
+            return np.array([values @ values])
+        return np.bincount(horizon, weights=np.square(values), minlength=self.horizons)
+
+    def update(self, y_true, y_pred, horizon=None):
+        """
+        Ajouter des paires (réel, prédiction). Matrices (lignes x horizons) :
+        la colonne donne l'horizon ; vecteurs : `horizon` donne l'indice
+        d'horizon de chaque paire (0 par défaut).
+        """
+        y_true = np.asarray(y_true, dtype=np.float64)
+        y_pred = np.asarray(y_pred, dtype=np.float64)
+        if y_true.shape != y_pred.shape:
+            raise ValueError(f"Dimensions incompatibles: {y_true.shape} et {y_pred.shape}")
+        if y_true.ndim == 2:
+            if y_true.shape[1] != self.horizons:
+                raise ValueError(f"{y_true.shape[1]} horizons reçus, {self.horizons} attendus")
+            horizon = np.broadcast_to(np.arange(self.horizons), y_true.shape).ravel()
+            y_true, y_pred = y_true.ravel(), y_pred.ravel()
+        elif horizon is not None:
+            horizon = np.asarray(horizon, dtype=np.int64)
+        elif self.horizons != 1:
+            horizon = np.zeros(len(y_true), dtype=np.int64)
+
+        for start in range(0, len(y_true), BLOCK_ROWS):
+            end = start + BLOCK_ROWS
+            self._update_block(y_true[start:end], y_pred[start:end], None if horizon is None else horizon[start:end])
+        return self
+
+    def _update_block(self, y_true, y_pred, horizon):
+        errors = y_pred - y_true
+        if np.isnan(errors).any():
+            valid = ~np.isnan(errors)
+            y_true, y_pred, errors = y_true[valid], y_pred[valid], errors[valid]
+            if horizon is not None:
+                horizon = horizon[valid]
+        if len(y_true) == 0:
+            return
+
+        if horizon is None:
+            count = np.array([len(y_true)])
+            mean = np.array([y_true.mean()])
+            m2 = self._squares(y_true - mean[0], None)
+        else:
+            count = np.bincount(horizon, minlength=self.horizons)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                mean = np.where(count > 0, self._totals(y_true, horizon) / count, 0.0)
+            m2 = self._squares(y_true - mean[horizon], horizon)
+
+        abs_errors = np.abs(errors)
+        abs_true = np.abs(y_true)
+        scale = abs_true + np.abs(y_pred)
+        nonzero = abs_true > 0
+        nonzero_scale = scale > 0
+        ape = np.divide(abs_errors, abs_true, out=np.zeros_like(abs_errors), where=nonzero)
+        sape = np.divide(2 * abs_errors, scale, out=np.zeros_like(abs_errors), where=nonzero_scale)
+
+        batch = {
+            "abs_error": self._totals(abs_errors, horizon),
+            "squared_error": self._squares(errors, horizon),
+            "error": self._totals(errors, horizon),
+            "ape": self._totals(ape, horizon),
+            "ape_count": self._totals(nonzero.astype(np.float64), horizon),
+            "sape": self._totals(sape, horizon),
+            "sape_count": self._totals(nonzero_scale.astype(np.float64), horizon)
+        }
+        self._combine(count, mean, m2, batch)
+
+    def _combine(self, count, mean, m2, sums):
+        total = self.count + count
+        delta = mean - self.mean
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weight = np.where(total > 0, count / total, 0.0)
+        self.m2 = self.m2 + m2 + delta ** 2 * self.count * weight
+        self.mean = self.mean + delta * weight
+        self.count = total
+        for name in _SUMS:
+            setattr(self, name, getattr(self, name) + sums[name])
+
+    def merge(self, other):
+        """
+        Ajouter les paires d'un autre accumulateur (mêmes horizons)
+        """
+        if other.horizons != self.horizons:
+            raise ValueError(f"Horizons différents: {self.horizons} et {other.horizons}")
+        self._combine(other.count, other.mean, other.m2, {name: getattr(other, name) for name in _SUMS})
+        return self
+
+    def overall(self):
+        """
+        Accumulateur à un seul horizon regroupant tous les horizons
+        """
+        result = ErrorAccumulator(1)
+        for h in range(self.horizons):
+            result._combine(
+                self.count[h:h + 1], self.mean[h:h + 1], self.m2[h:h + 1],
+                {name: getattr(self, name)[h:h + 1] for name in _SUMS}
+            )
+        return result
+
+    def values(self):
+        """
+        Métriques par horizon (tableaux, NaN si non définies). Le R² d'une
+        série constante vaut 1 si les prédictions sont exactes, 0 sinon,
+        comme dans scikit-learn.
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            count = np.where(self.count > 0, self.count, np.nan)
+            r2 = np.where(self.m2 > 0, 1 - self.squared_error / self.m2,
+                          np.where(self.squared_error == 0, 1.0, 0.0))
+            return {
+                "MAE": self.abs_error / count,
+                "RMSE": np.sqrt(self.squared_error / count),
+                "R2": np.where(self.count > 1, r2, np.nan),
+                "MAPE": np.where(self.ape_count > 0, self.ape / self.ape_count * 100, np.nan),
+                "sMAPE": np.where(self.sape_count > 0, self.sape / self.sape_count * 100, np.nan),
+                "Bias": self.error / count
+            }
+
+    def summary(self, digits=None, by_horizon=False):
+        """
+        Métriques sérialisables en JSON : listes par horizon (avec
+        by_horizon ou plusieurs horizons), nombres sinon ; None pour une
+        métrique non définie
+        """
+        def clean(value):
+            if value != value:
+                return None
+            return round(float(value), digits) if digits is not None else float(value)
+
+        result = {}
+        for name, values in self.values().items():
+            cleaned = [clean(value) for value in values]
+            result[name] = cleaned if by_horizon or self.horizons > 1 else cleaned[0]
+        return result
+
+
+def error_metrics(y_true, y_pred, digits=None):
+    """
+    Métriques d'erreur d'une série, en une passe
+    """
+    return ErrorAccumulator().update(y_true, y_pred).summary(digits)
+
+
+def sklearn_metrics(y_true, y_pred):
+    """
+    MAE, RMSE et R² calculés par scikit-learn (import paresseux), pour les
+    seules vérifications de parité
+    """
+    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+    return {
+        "MAE": float(mean_absolute_error(y_true, y_pred)),
+        "RMSE": float(np.sqrt(mean_squared_error(y_true, y_pred))),
+        "R2": float(r2_score(y_true, y_pred))
+    }
+
+
+def check_parity(y_true, y_pred, tolerance=1e-9):
+    """
+    Comparer l'accumulateur à scikit-learn. Renvoie l'écart relatif maximal
+    observé et lève une erreur s'il dépasse la tolérance.
+    """
+    expected = sklearn_metrics(y_true, y_pred)
+    actual = error_metrics(y_true, y_pred)
+    error = max(abs(actual[name] - value) / max(1.0, abs(value)) for name, value in expected.items())
+    if not error <= tolerance:
+        raise ValueError(f"Écart métriques / scikit-learn trop grand: {error:.3e} > {tolerance:.0e}")
+    return error
@@ -0,0 +1,108 @@
+"""
+Agrégation des prédictions journalières par semaine, mois ou trimestre
+calendaires.
+
+Sommer les bornes journalières yhat_lower / yhat_upper donne des intervalles
+bien trop larges : les quantiles d'une somme ne sont pas la somme des
+quantiles. On somme donc les trajectoires simulées par Prophet
+(predictive_samples) sur chaque période, puis on prend les quantiles de ces
+sommes. Un seul tirage d'échantillons sert à toutes les granularités ; les
+sommes par période sont calculées d'un bloc avec np.add.reduceat.
+"""
+import numpy as np
+import pandas as pd
+
+GRANULARITIES = ("week", "month", "quarter")
+
+# Semaines du lundi au dimanche : le 1970-01-05 (jour 4 de l'époque) est un lundi
+_FIRST_MONDAY = 4
+
+
+def _period_codes(days, granularity):
+    """
+    Numéro de période calendaire de chaque jour (datetime64[D])
+    """
+    if granularity == "week":
+        return (days.astype(np.int64) - _FIRST_MONDAY) // 7
+    months = days.astype('datetime64[M]').astype(np.int64)
+    if granularity == "month":
+        return months
+    if granularity == "quarter":
+        return months // 3
+    raise ValueError(f"Granularité inconnue: {granularity} (disponibles: {', '.join(GRANULARITIES)})")
+
+
+def _period_bounds(codes, granularity):
+    """
+    Premier jour et nombre de jours des périodes de numéros `codes`
+    """
+    if granularity == "week":
+        first = (codes * 7 + _FIRST_MONDAY).astype('datetime64[D]')
+        return first, np.full(len(codes), 7)
+    months = codes * 3 if granularity == "quarter" else codes
+    step = 3 if granularity == "quarter" else 1
+    first = months.astype('datetime64[M]').astype('datetime64[D]')
+    following = (months + step).astype('datetime64[M]').astype('datetime64[D]')
+    return first, (following - first).astype(np.int64)
+
+
+def _period_labels(first_days, granularity):
+    starts = pd.DatetimeIndex(first_days)
+    if granularity == "week":
+        iso = starts.isocalendar()
+        return [f"{year}-W{week:02d}" for year, week in zip(iso["year"], iso["week"])]
+    if granularity == "month":
+        return starts.strftime('%Y-%m').tolist()
+    return [f"{start.year}-Q{start.quarter}" for start in starts]
+
+
+def period_window(start_date, periods, granularity="month"):
+    """
+    Premier et dernier jour de `periods` périodes calendaires complètes,
+    à partir de celle qui contient start_date
+    """
+    if periods < 1:
+        raise ValueError("Le nombre de périodes doit être au moins 1")
+    day = np.datetime64(pd.Timestamp(start_date).date(), 'D')
+    code = _period_codes(np.array([day]), granularity)[0]
+    first, _ = _period_bounds(np.array([code]), granularity)
+    last_first, last_length = _period_bounds(np.array([code + periods - 1]), granularity)
+    last = last_first[0] + np.timedelta64(int(last_length[0]) - 1, 'D')
+    return pd.Timestamp(first[0]), pd.Timestamp(last)
+
+
+def aggregate_periods(dates, yhat, samples=None, granularity="month", interval_width=0.8):
+    """
+    Sommer une prédiction journalière (dates consécutives) par période
+    calendaire. Seules les périodes entièrement couvertes sont gardées.
+
+    `samples` : matrice (jours x trajectoires) de predictive_samples, ou None
+    pour ne renvoyer que les totaux. Les bornes sont les quantiles
+    (1 - interval_width) / 2 et (1 + interval_width) / 2 des totaux simulés.
+    """
+    days = pd.to_datetime(dates).to_numpy().astype('datetime64[D]')
+    yhat = np.asarray(yhat, dtype=np.float64)
+    columns = ['period', 'start', 'end', 'days', 'yhat']
+    if samples is not None:
+        columns += ['yhat_lower', 'yhat_upper']
+    if len(days) == 0:
+        return pd.DataFrame(columns=columns)
+
+    codes = _period_codes(days, granularity)
+    starts = np.flatnonzero(np.diff(codes, prepend=codes[0] - 1))
+    lengths = np.diff(np.append(starts, len(days)))
+    first_days, expected = _period_bounds(codes[starts], granularity)
+    full = (lengths == expected) & (days[starts] == first_days)
+
+    result = pd.DataFrame({
+        'period': _period_labels(first_days[full], granularity),
+        'start': pd.DatetimeIndex(first_days[full]),
+        'end': pd.DatetimeIndex(first_days[full] + (expected[full] - 1).astype('timedelta64[D]')),
+        'days': lengths[full],
+        'yhat': np.add.reduceat(yhat, starts)[full]
+    })
+    if samples is not None:
+        totals = np.add.reduceat(np.asarray(samples, dtype=np.float64), starts, axis=0)[full]
+        alpha = (1 - interval_width) / 2
+        result['yhat_lower'], result['yhat_upper'] = np.quantile(totals, [alpha, 1 - alpha], axis=1)
+    return result[columns]
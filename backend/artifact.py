@@ -0,0 +1,181 @@
+"""
+Format d'inférence allégé : un répertoire contenant
+
+    meta.json      paramètres scalaires du moteur NumPy, plage de la table
+    *.npy          tableaux (points de rupture, coefficients, jours
+                   spéciaux, table des prédictions journalières)
+    model.json     modèle Prophet sérialisé sans son historique, chargé
+                   seulement pour les intervalles hors de la table
+
+Les .npy sont ouverts en mémoire partagée, en lecture seule (np.load avec
+mmap_mode='r') : les workers uvicorn qui chargent le même artefact
+partagent les mêmes pages, et le démarrage n'importe ni ne décode Prophet.
+
+Usage (depuis backend/) :
+    python artifact.py prophet_model.pkl prophet_model
+"""
+import argparse
+import copy
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+import config
+from forecast_table import ForecastTable
+from numpy_engine import NumpyProphet, check_parity
+from utils import create_future_dates, add_regressors, model_for_interval_mode
+
+ARTIFACT_FORMAT = 1
+META_FILE = "meta.json"
+MODEL_FILE = "model.json"
+
+# Tableaux du moteur NumPy et de la table, un fichier .npy chacun
+ENGINE_ARRAYS = ("deltas", "changepoints_t", "holiday_matrix", "beta_additive", "beta_multiplicative")
+TABLE_ARRAYS = ("yhat", "yhat_lower", "yhat_upper")
+
+# Lignes d'historique gardées dans model.json : Prophet s'en sert pour le
+# pas de temps de l'incertitude de tendance d'une prédiction d'un seul jour
+HISTORY_ROWS = 2
+
+
+def is_artifact(path):
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, META_FILE))
+
+
+def strip_history(model, rows=HISTORY_ROWS):
+    """
+    Copie légère du modèle sans son historique d'entraînement
+    """
+    slim = copy.copy(model)
+    slim.history = model.history.tail(rows).reset_index(drop=True)
+    slim.history_dates = model.history_dates.tail(rows).reset_index(drop=True)
+    return slim
+
+
+def export_artifact(model, path, table_start=None, table_end=None, horizon_days=730):
+    """
+    Écrire l'artefact d'inférence d'un modèle Prophet entraîné.
+    Le répertoire est construit à côté puis renommé.
+    """
+    from prophet.serialize import model_to_json
+
+    numpy_model = NumpyProphet.from_model(model)
+    parity_df = add_regressors(
+        create_future_dates(model.history['ds'].min(), len(model.history) + 365),
+        include_target=False
+    )
+    parity_error = check_parity(model_for_interval_mode(model, "none"), numpy_model, parity_df)
+    table = ForecastTable.build(model, start=table_start, end=table_end, horizon_days=horizon_days)
+
+    tmp_path = f"{path.rstrip(os.sep)}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    for name in ENGINE_ARRAYS:
+        np.save(os.path.join(tmp_path, f"{name}.npy"), np.ascontiguousarray(getattr(numpy_model, name)))
+    for name in TABLE_ARRAYS:
+        np.save(os.path.join(tmp_path, f"table_{name}.npy"), getattr(table, name))
+
+    with open(os.path.join(tmp_path, MODEL_FILE), "w") as f:
+        f.write(model_to_json(strip_history(model)))
+
+    meta = {
+        "format": ARTIFACT_FORMAT,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "engine": {
+            "start": numpy_model.start,
+            "t_scale": numpy_model.t_scale,
+            "y_scale": numpy_model.y_scale,
+            "floor": numpy_model.floor,
+            "k": numpy_model.k,
+            "m": numpy_model.m,
+            "seasonalities": numpy_model.seasonalities,
+            "holiday_first_day": numpy_model.holiday_first_day,
+            "regressors": numpy_model.regressors,
+            "columns": numpy_model.columns
+        },
+        "table_start": str(table.start),
+        "uncertainty_samples": model.uncertainty_samples,
+        "parity_error": parity_error
+    }
+    with open(os.path.join(tmp_path, META_FILE), "w") as f:
+        json.dump(meta, f, indent=2)
+
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.replace(tmp_path, path)
+    return meta
+
+
+def load_artifact(path, mmap=True):
+    """
+    Ouvrir un artefact : renvoie (numpy_model, forecast_table, model_loader, meta).
+    `model_loader()` décode le modèle Prophet, à n'appeler qu'au besoin.
+    """
+    with open(os.path.join(path, META_FILE)) as f:
+        meta = json.load(f)
+    if meta.get("format") != ARTIFACT_FORMAT:
+        raise ValueError(f"Format d'artefact non pris en charge: {meta.get('format')}")
+
+    mmap_mode = "r" if mmap else None
+
+    def array(name):
+        return np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+
+    engine = meta["engine"]
+    numpy_model = NumpyProphet(
+        start=engine["start"],
+        t_scale=engine["t_scale"],
+        y_scale=engine["y_scale"],
+        floor=engine["floor"],
+        k=engine["k"],
+        m=engine["m"],
+        deltas=array("deltas"),
+        changepoints_t=array("changepoints_t"),
+        seasonalities=[tuple(s) for s in engine["seasonalities"]],
+        holiday_first_day=engine["holiday_first_day"],
+        holiday_matrix=array("holiday_matrix"),
+        regressors=[tuple(r) for r in engine["regressors"]],
+        beta_additive=array("beta_additive"),
+        beta_multiplicative=array("beta_multiplicative"),
+        columns=engine["columns"]
+    )
+    forecast_table = ForecastTable(
+        meta["table_start"], *(array(f"table_{name}") for name in TABLE_ARRAYS)
+    )
+
+    def model_loader():
+        from prophet.serialize import model_from_json
+        with open(os.path.join(path, MODEL_FILE)) as f:
+            return model_from_json(f.read())
+
+    return numpy_model, forecast_table, model_loader, meta
+
+
+def artifact_size(path):
+    return sum(
+        os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("model", help="modèle Prophet picklé (joblib)")
+    parser.add_argument("output", help="répertoire de l'artefact")
+    parser.add_argument("--table-start", default=config.FORECAST_TABLE_START)
+    parser.add_argument("--table-end", default=config.FORECAST_TABLE_END)
+    parser.add_argument("--horizon-days", type=int, default=config.FORECAST_TABLE_HORIZON_DAYS)
+    args = parser.parse_args()
+
+    import joblib
+    model = joblib.load(args.model)
+    meta = export_artifact(model, args.output, args.table_start, args.table_end, args.horizon_days)
+    print(f"Artefact écrit dans {args.output} ({artifact_size(args.output)} octets, "
+          f"écart NumPy / Prophet {meta['parity_error']:.1e})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Backtest à origine glissante : le modèle est réentraîné à chaque date de
+coupure sur l'historique disponible à cette date, puis évalué sur les
+`horizon_days` jours suivants. Les erreurs sont agrégées par horizon
+(J+1, J+2, ...) sur l'ensemble des coupures.
+
+Les coupures sont réparties en chaînes contiguës sur un pool de processus ;
+dans une chaîne, chaque ajustement part des paramètres du précédent
+(démarrage à chaud), le premier part de zéro. Chaque chaîne cumule ses
+erreurs par horizon dans un ErrorAccumulator, fusionné ensuite avec ceux
+des autres chaînes.
+
+Usage (depuis backend/) :
+    python backtest.py --model prophet_model.pkl --horizon-days 90 --output backtest.json
+    python backtest.py --series series.csv --segment product_line:Children --workers 4
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import config
+import train
+from accuracy import ErrorAccumulator
+from train import fit_model, warm_start_params, load_template, complete_days, read_series_file
+from utils import add_regressors, model_for_interval_mode
+
+
+def generate_cutoffs(series, initial_days, period_days, horizon_days):
+    """
+    Dates de coupure, de la plus ancienne à la plus récente : la dernière
+    laisse `horizon_days` jours d'évaluation, chacune garde au moins
+    `initial_days` jours d'entraînement
+    """
+    if period_days <= 0 or horizon_days <= 0:
+        raise ValueError(f"period_days et horizon_days doivent être strictement positifs "
+                         f"(reçus: {period_days}, {horizon_days})")
+    start, end = series['ds'].min(), series['ds'].max()
+    cutoff = end - pd.Timedelta(days=horizon_days)
+    cutoffs = []
+    while cutoff - start >= pd.Timedelta(days=initial_days - 1):
+        cutoffs.append(cutoff)
+        cutoff -= pd.Timedelta(days=period_days)
+    if not cutoffs:
+        raise ValueError(
+            f"Historique trop court ({len(series)} jours) pour {initial_days} jours d'entraînement "
+            f"et {horizon_days} jours d'horizon"
+        )
+    return cutoffs[::-1]
+
+
+def run_chain(series, cutoffs, horizon_days, warm_start=True):
+    """
+    Évaluer une chaîne de coupures dans un processus du pool (modèle de
+    référence chargé par train._init_worker) ; renvoie (coupures, erreurs
+    cumulées par horizon)
+    """
+    folds = []
+    errors = ErrorAccumulator(horizon_days)
+    previous = None
+    for cutoff in cutoffs:
+        history = series[series['ds'] <= cutoff]
+        actual = series[(series['ds'] > cutoff) & (series['ds'] <= cutoff + pd.Timedelta(days=horizon_days))]
+        init = warm_start_params(previous) if warm_start and previous is not None else None
+        model, fit_seconds, warm = fit_model(train._template, add_regressors(history, include_target=False), init)
+        forecast = model_for_interval_mode(model, "none").predict(add_regressors(actual[['ds']], include_target=False))
+        errors.update(actual['y'].to_numpy()[np.newaxis], forecast['yhat'].to_numpy()[np.newaxis])
+        folds.append({
+            "cutoff": cutoff.strftime('%Y-%m-%d'),
+            "train_days": len(history),
+            "fit_seconds": fit_seconds,
+            "warm_start": warm
+        })
+        previous = model
+    return folds, errors
+
+
+def run_backtest(series, template_path, initial_days=730, period_days=90, horizon_days=90,
+                 workers=None, warm_start=True):
+    """
+    Backtest complet sur une série journalière (ds, y) ; renvoie le rapport
+    (dictionnaire sérialisable en JSON)
+    """
+    series = complete_days(series[['ds', 'y']])
+    cutoffs = generate_cutoffs(series, initial_days, period_days, horizon_days)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(cutoffs)))
+    if warm_start:
+        # Chaînes d'au moins deux coupures : seule la première part à froid
+        workers = min(workers, max(1, len(cutoffs) // 2))
+    chains = [list(chain) for chain in np.array_split(np.array(cutoffs, dtype=object), workers) if len(chain)]
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=train._init_worker, initargs=(template_path,)) as pool:
+        futures = [pool.submit(run_chain, series, chain, horizon_days, warm_start) for chain in chains]
+        folds, errors = [], ErrorAccumulator(horizon_days)
+        for future in futures:
+            chain_folds, chain_errors = future.result()
+            folds.extend(chain_folds)
+            errors.merge(chain_errors)
+    elapsed = time.perf_counter() - start
+
+    warm = [fold["fit_seconds"] for fold in folds if fold["warm_start"]]
+    cold = [fold["fit_seconds"] for fold in folds if not fold["warm_start"]]
+    return {
+        "created_at": datetime.now().isoformat(),
+        "history": {
+            "start": series['ds'].min().strftime('%Y-%m-%d'),
+            "end": series['ds'].max().strftime('%Y-%m-%d'),
+            "days": len(series)
+        },
+        "settings": {
+            "initial_days": initial_days,
+            "period_days": period_days,
+            "horizon_days": horizon_days,
+            "workers": workers,
+            "warm_start": warm_start
+        },
+        "elapsed_seconds": round(elapsed, 3),
+        "fit_seconds": {
+            "cold_mean": round(float(np.mean(cold)), 3) if cold else None,
+            "warm_mean": round(float(np.mean(warm)), 3) if warm else None,
+            "total": round(float(sum(cold) + sum(warm)), 3)
+        },
+        "folds": [
+            {
+                "cutoff": fold["cutoff"],
+                "train_days": fold["train_days"],
+                "warm_start": fold["warm_start"],
+                "fit_seconds": round(fold["fit_seconds"], 3)
+            }
+            for fold in folds
+        ],
+        "metrics": errors.overall().summary(digits=4),
+        "by_horizon": errors.summary(digits=4, by_horizon=True)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=config.MODEL_PATH,
+                        help="modèle de référence (configuration, et historique si --series est absent)")
+    parser.add_argument("--series", default=None, help="séries journalières agrégées (segment, ds, y)")
+    parser.add_argument("--segment", default=None, help="segment à évaluer dans --series")
+    parser.add_argument("--initial-days", type=int, default=730)
+    parser.add_argument("--period-days", type=int, default=90)
+    parser.add_argument("--horizon-days", type=int, default=90)
+    parser.add_argument("--workers", type=int, default=None, help="défaut : nombre de cœurs")
+    parser.add_argument("--no-warm-start", action="store_true", help="ajuster chaque coupure à partir de zéro")
+    parser.add_argument("--output", default=None, help="rapport JSON")
+    args = parser.parse_args()
+
+    if args.series:
+        series_by_segment = read_series_file(args.series)
+        if args.segment not in series_by_segment:
+            parser.error(f"segment introuvable dans {args.series}: {args.segment}")
+        series = series_by_segment[args.segment]
+    else:
+        series = load_template(args.model).history[['ds', 'y']]
+
+    report = run_backtest(series, args.model, args.initial_days, args.period_days, args.horizon_days,
+                          workers=args.workers, warm_start=not args.no_warm_start)
+    print(f"{len(report['folds'])} coupure(s) en {report['elapsed_seconds']:.1f}s "
+          f"(ajustement à froid {report['fit_seconds']['cold_mean']}s, à chaud {report['fit_seconds']['warm_mean']}s)")
+    print(f"MAE {report['metrics']['MAE']:.2f}  RMSE {report['metrics']['RMSE']:.2f}  "
+          f"MAPE {report['metrics']['MAPE']:.2f}%  sMAPE {report['metrics']['sMAPE']:.2f}%  "
+          f"biais {report['metrics']['Bias']:+.2f}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Rapport écrit dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
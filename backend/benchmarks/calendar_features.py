@@ -0,0 +1,47 @@
+"""
+Variables calendaires : calcul pandas (ancienne implémentation de
+add_regressors) contre lecture dans la table précalculée.
+
+Usage (depuis backend/) :
+    python -m benchmarks.calendar_features --rows 1000 100000 1000000
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+
+from calendar_features import calendar_table, calendar_features, compute_calendar_features
+
+
+def median_ms(func, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    table = calendar_table()
+    print(f"Table : {table.shape[0]} jours x {table.shape[1]} colonnes, {table.nbytes / 1024:.0f} Ko")
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'lignes':>9} {'pandas (ms)':>12} {'table (ms)':>11} {'gain':>6}")
+    for rows in args.rows:
+        ds = pd.Series(pd.Timestamp('2015-01-01') + pd.to_timedelta(rng.integers(0, 3650, rows), unit='D'))
+        pandas_ms = median_ms(lambda: compute_calendar_features(ds), args.repeat)
+        table_ms = median_ms(lambda: calendar_features(ds), args.repeat)
+        print(f"{rows:>9} {pandas_ms:>12.2f} {table_ms:>11.2f} {pandas_ms / table_ms:>5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Démarrage à froid d'un worker : temps de chargement et de préchauffage du
+modèle (comme ModelRegistry.load_default) et mémoire (RSS, et pages
+partagées entre workers) pour le pickle et l'artefact allégé.
+
+Chaque mesure tourne dans un processus neuf, comme un worker uvicorn, avec
+le moteur configuré (FORECAST_ENGINE) sauf --engine.
+
+Usage (depuis backend/) :
+    python artifact.py prophet_model.pkl prophet_model
+    python -m benchmarks.cold_start --pickle prophet_model.pkl --artifact prophet_model
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+import config
+
+# Exécuté dans le processus fils : charge et préchauffe le modèle comme le
+# backend et renvoie les mesures en JSON
+CHILD = r"""
+import json, sys, time
+
+def memory_kb():
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return fields
+
+import numpy, pandas
+from registry import load_bundle, warm_bundle
+before = memory_kb()
+start = time.perf_counter()
+bundle = load_bundle(sys.argv[1], engine=sys.argv[2], table_enabled=True)
+load_seconds = time.perf_counter() - start
+warm_bundle(bundle)
+ready_seconds = time.perf_counter() - start
+after = memory_kb()
+print(json.dumps({
+    "load_seconds": load_seconds,
+    "ready_seconds": ready_seconds,
+    "rss_kb": after["Rss"] - before["Rss"],
+    "private_kb": after["Private_Clean"] + after["Private_Dirty"]
+                  - before["Private_Clean"] - before["Private_Dirty"],
+    "prophet_imported": "prophet" in sys.modules
+}))
+"""
+
+
+def measure(path, engine):
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD, path, engine],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pickle", default="prophet_model.pkl")
+    parser.add_argument("--artifact", default="prophet_model")
+    parser.add_argument("--engine", default=config.FORECAST_ENGINE, choices=["prophet", "numpy"])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"moteur : {args.engine}")
+    print(f"{'format':>9} {'chargement (s)':>15} {'prêt (s)':>9} {'RSS ajouté (Mo)':>16} {'privé (Mo)':>11} "
+          f"{'prophet importé':>16}")
+    for label, path in (("pickle", args.pickle), ("artefact", args.artifact)):
+        runs = [measure(path, args.engine) for _ in range(args.repeat)]
+        best = min(runs, key=lambda r: r["ready_seconds"])
+        print(f"{label:>9} {best['load_seconds']:>15.3f} {best['ready_seconds']:>9.3f} {best['rss_kb'] / 1024:>16.1f} "
+              f"{best['private_kb'] / 1024:>11.1f} {str(best['prophet_imported']):>16}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Latence de model.predict selon le mode d'intervalle (none / fast / full).
+
+Usage (depuis backend/) :
+    python -m benchmarks.interval_modes --periods 30 90 365 --repeat 5
+"""
+import argparse
+import statistics
+import time
+
+import joblib
+
+import config
+from utils import create_future_dates, add_regressors, model_for_interval_mode
+
+MODES = ("none", "fast", "full")
+
+
+def time_predict(model, df, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        model.predict(df)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="prophet_model.pkl")
+    parser.add_argument("--start-date", default="2022-01-01")
+    parser.add_argument("--periods", type=int, nargs="+", default=[30, 90, 365])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--fast-samples", type=int, default=config.FAST_UNCERTAINTY_SAMPLES)
+    args = parser.parse_args()
+
+    model = joblib.load(args.model)
+
+    print(f"{'periods':>8} {'mode':>6} {'p50 (ms)':>10} {'min (ms)':>10}")
+    for periods in args.periods:
+        df = add_regressors(create_future_dates(args.start_date, periods), include_target=False)
+        for mode in MODES:
+            light_model = model_for_interval_mode(model, mode, args.fast_samples)
+            durations = time_predict(light_model, df, args.repeat)
+            print(f"{periods:>8} {mode:>6} {statistics.median(durations) * 1000:>10.1f} {min(durations) * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Test de charge de bout en bout de l'API : débit soutenu et latences
+p50 / p95 / p99 de /predict, /predict-next-months et /predict-csv sous
+concurrence.
+
+L'application tourne dans le processus du test (transport ASGI de httpx),
+dans un uvicorn local lancé pour l'occasion, ou derrière une URL existante.
+Nécessite httpx (`pip install -r requirements-dev.txt`).
+
+Usage (depuis backend/) :
+    python -m benchmarks.load_test --concurrency 16 --duration 30
+    python -m benchmarks.load_test --uvicorn-workers 4 --mix predict=6,next_months=2,csv=2
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --csv-rows 100000 --gzip
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+ENDPOINTS = ("predict", "next_months", "csv")
+
+
+def parse_mix(text):
+    """
+    'predict=6,next_months=2,csv=2' -> {'predict': 6, ...}
+    """
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"endpoint inconnu: {name} (disponibles: {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def make_csv(rows, compress=False, seed=0):
+    """
+    Fichier de ventes synthétique (date, sales) de `rows` lignes
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp("2019-01-01") + pd.to_timedelta(np.sort(rng.integers(0, 1000, rows)), unit="D")
+    df = pd.DataFrame({"date": dates.strftime("%Y-%m-%d"), "sales": rng.gamma(2.0, 50.0, rows).round(2)})
+    content = df.to_csv(index=False).encode()
+    return gzip.compress(content) if compress else content
+
+
+class RequestFactory:
+    """Construit les requêtes du mélange demandé"""
+
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.csv = make_csv(args.csv_rows, args.gzip, args.seed) if "csv" in args.mix else None
+        self.names = list(args.mix)
+        self.weights = [args.mix[name] for name in self.names]
+        start = pd.Timestamp(args.start_min)
+        span = (pd.Timestamp(args.start_max) - start).days
+        self.start_dates = [(start + pd.Timedelta(days=d)).strftime("%Y-%m-%d") for d in range(span + 1)]
+
+    def next(self):
+        name = self.rng.choices(self.names, self.weights)[0]
+        params = {"format": self.args.format}
+        if name == "predict":
+            body = {
+                "start_date": self.rng.choice(self.start_dates),
+                "periods": self.rng.choice(self.args.periods),
+                "interval_mode": self.args.interval_mode
+            }
+            return name, {"method": "POST", "url": "/predict", "json": body, "params": params}
+        if name == "next_months":
+            params["interval_mode"] = self.args.interval_mode
+            return name, {"method": "POST", "url": "/predict-next-months", "params": params}
+        filename = "ventes.csv.gz" if self.args.gzip else "ventes.csv"
+        return name, {"method": "POST", "url": "/predict-csv", "params": params,
+                      "files": {"file": (filename, self.csv, "text/csv")}}
+
+
+async def worker(client, factory, deadline, remaining, samples):
+    while time.perf_counter() < deadline:
+        if remaining is not None:
+            if remaining[0] <= 0:
+                return
+            remaining[0] -= 1
+        name, request = factory.next()
+        start = time.perf_counter()
+        try:
+            response = await client.request(**request)
+            status = response.status_code
+            if status == 200 and response.headers.get("content-type", "").startswith("application/json"):
+                ok = response.json().get("success", True) is not False
+            else:
+                ok = status == 200
+        except httpx.HTTPError as e:
+            status, ok = type(e).__name__, False
+        samples.append((name, time.perf_counter() - start, status, ok))
+
+
+def summarize(samples, elapsed):
+    """
+    Débit et percentiles de latence par endpoint et au total
+    """
+    def stats(rows):
+        latencies = np.array([r[1] for r in rows]) * 1000
+        statuses = {}
+        for r in rows:
+            statuses[str(r[2])] = statuses.get(str(r[2]), 0) + 1
+        return {
+            "requests": len(rows),
+            "errors": sum(1 for r in rows if not r[3]),
+            "rps": len(rows) / elapsed if elapsed else 0.0,
+            "p50_ms": float(np.percentile(latencies, 50)) if len(rows) else None,
+            "p95_ms": float(np.percentile(latencies, 95)) if len(rows) else None,
+            "p99_ms": float(np.percentile(latencies, 99)) if len(rows) else None,
+            "max_ms": float(latencies.max()) if len(rows) else None,
+            "statuses": statuses
+        }
+
+    report = {name: stats([s for s in samples if s[0] == name]) for name in sorted({s[0] for s in samples})}
+    report["total"] = stats(samples)
+    return report
+
+
+def print_report(report, elapsed, concurrency):
+    print(f"\n{elapsed:.1f}s, concurrence {concurrency}")
+    print(f"{'endpoint':<12} {'requêtes':>9} {'erreurs':>8} {'req/s':>8} {'p50 (ms)':>9} "
+          f"{'p95 (ms)':>9} {'p99 (ms)':>9} {'max (ms)':>9}  statuts")
+    for name, row in report.items():
+        if not row["requests"]:
+            continue
+        statuses = " ".join(f"{code}:{n}" for code, n in sorted(row["statuses"].items()))
+        print(f"{name:<12} {row['requests']:>9} {row['errors']:>8} {row['rps']:>8.1f} {row['p50_ms']:>9.1f} "
+              f"{row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['max_ms']:>9.1f}  {statuses}")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_uvicorn(workers, env_overrides):
+    """
+    Lancer un uvicorn local et attendre que /health réponde
+    """
+    port = free_port()
+    env = {**os.environ, **env_overrides}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        env=env
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("uvicorn s'est arrêté au démarrage")
+        try:
+            if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                return process, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError("uvicorn n'a pas répondu à temps")
+
+
+async def run(args, client):
+    factory = RequestFactory(args)
+
+    # Échauffement : chargement paresseux, caches, premiers tracés
+    for _ in range(args.warmup):
+        _, request = factory.next()
+        await client.request(**request)
+
+    samples = []
+    remaining = [args.requests] if args.requests else None
+    deadline = time.perf_counter() + (args.duration if not args.requests else float("inf"))
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        worker(client, factory, deadline, remaining, samples) for _ in range(args.concurrency)
+    ))
+    return samples, time.perf_counter() - start
+
+
+async def main_async(args):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    timeout = httpx.Timeout(args.timeout)
+    process = None
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, limits=limits, timeout=timeout)
+    elif args.uvicorn_workers:
+        process, url = start_uvicorn(args.uvicorn_workers, {"EXECUTOR_MAX_QUEUE": str(args.concurrency * 4)})
+        print(f"uvicorn lancé sur {url} ({args.uvicorn_workers} worker(s))")
+        client = httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout)
+    else:
+        import main
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app),
+                                   base_url="http://test", timeout=timeout)
+
+    try:
+        async with client:
+            return await run(args, client)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", default=None, help="API déjà lancée (défaut : application dans le processus)")
+    target.add_argument("--uvicorn-workers", type=int, default=0, help="lancer un uvicorn local avec N workers")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20.0, help="durée du test en secondes")
+    parser.add_argument("--requests", type=int, default=0, help="nombre total de requêtes (remplace --duration)")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("predict=6,next_months=2,csv=2"))
+    parser.add_argument("--periods", type=int, nargs="+", default=[30, 90, 180])
+    parser.add_argument("--start-min", default="2021-01-01")
+    parser.add_argument("--start-max", default="2023-06-30")
+    parser.add_argument("--interval-mode", default="full", choices=["none", "fast", "full"])
+    parser.add_argument("--format", default="rows", choices=["rows", "columns"])
+    parser.add_argument("--csv-rows", type=int, default=10_000, help="taille du fichier envoyé à /predict-csv")
+    parser.add_argument("--gzip", action="store_true", help="envoyer le fichier compressé en gzip")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="rapport JSON")
+    args = parser.parse_args()
+
+    if httpx is None:
+        parser.error("le test de charge nécessite le paquet 'httpx' (pip install -r requirements-dev.txt)")
+
+    samples, elapsed = asyncio.run(main_async(args))
+    report = summarize(samples, elapsed)
+    print_report(report, elapsed, args.concurrency)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "elapsed_seconds": elapsed,
+                "concurrency": args.concurrency,
+                "mix": args.mix,
+                "csv_rows": args.csv_rows,
+                "gzip": args.gzip,
+                "interval_mode": args.interval_mode,
+                "target": args.url or (f"uvicorn x{args.uvicorn_workers}" if args.uvicorn_workers else "in-process"),
+                "endpoints": report
+            }, f, indent=2)
+        print(f"\nRapport écrit dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
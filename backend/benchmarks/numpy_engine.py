@@ -0,0 +1,49 @@
+"""
+Parité et latence du moteur NumPy face à model.predict (prédiction ponctuelle).
+
+Usage (depuis backend/) :
+    python -m benchmarks.numpy_engine --periods 90 3650 --repeat 20
+"""
+import argparse
+import statistics
+import time
+
+import joblib
+
+from numpy_engine import NumpyProphet, check_parity
+from utils import create_future_dates, add_regressors, model_for_interval_mode
+
+
+def median_ms(func, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="prophet_model.pkl")
+    parser.add_argument("--start-date", default=None, help="défaut : début de l'historique")
+    parser.add_argument("--periods", type=int, nargs="+", default=[90, 3650])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--tolerance", type=float, default=1e-8)
+    args = parser.parse_args()
+
+    model = model_for_interval_mode(joblib.load(args.model), "none")
+    evaluator = NumpyProphet.from_model(model)
+    start_date = args.start_date or model.history['ds'].min()
+
+    print(f"{'periods':>8} {'écart max':>10} {'prophet (ms)':>13} {'numpy (ms)':>11}")
+    for periods in args.periods:
+        df = add_regressors(create_future_dates(start_date, periods), include_target=False)
+        error = check_parity(model, evaluator, df, args.tolerance)
+        prophet_ms = median_ms(lambda: model.predict(df), max(1, args.repeat // 4))
+        numpy_ms = median_ms(lambda: evaluator.predict_frame(df), args.repeat)
+        print(f"{periods:>8} {error:>10.1e} {prophet_ms:>13.1f} {numpy_ms:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
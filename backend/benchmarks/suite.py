@@ -0,0 +1,259 @@
+"""
+Suite de micro-benchmarks des chemins chauds du backend, sur des séries
+journalières synthétiques (1k, 10k, 100k et 1M lignes par défaut).
+
+Les résultats sont écrits en JSON et peuvent être comparés à une référence :
+un cas est en régression si sa médiane dépasse celle de la référence de plus
+de --threshold (25 % par défaut) et d'au moins --min-delta-ms. Le code de
+sortie vaut alors 1. Tout tourne hors ligne, sur CPU.
+
+Usage (depuis backend/) :
+    python -m benchmarks.suite --output resultats.json
+    python -m benchmarks.suite --baseline benchmarks/baseline.json
+    python -m benchmarks.suite --sizes 1000 10000 --cases add_regressors predict_numpy
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from accuracy import sklearn_metrics
+from numpy_engine import NumpyProphet
+from plots import plot_source, render_png, chart_data
+from serialization import FastJSONResponse, serialize_frame
+from utils import create_future_dates, add_regressors, calculate_metrics, model_for_interval_mode
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+# Au-delà, les dates consécutives sortiraient de la plage des Timestamp pandas
+MAX_CONSECUTIVE_DAYS = 100_000
+
+
+def synthetic_series(rows, seed=0):
+    """
+    Série de ventes synthétique : `rows` lignes réparties sur dix ans de
+    dates (plusieurs lignes par jour au-delà de 3650 lignes), triées
+    """
+    rng = np.random.default_rng(seed)
+    days = np.sort(rng.integers(0, 3650, rows))
+    ds = pd.Timestamp('2015-01-01') + pd.to_timedelta(days, unit='D')
+    y = rng.gamma(2.0, 500.0, rows)
+    return pd.DataFrame({'ds': ds, 'y': y})
+
+
+def synthetic_forecast(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    df = synthetic_series(rows, seed)
+    yhat = df['y'].to_numpy()
+    return pd.DataFrame({
+        'ds': df['ds'],
+        'yhat': yhat,
+        'yhat_lower': yhat - rng.uniform(50, 200, rows),
+        'yhat_upper': yhat + rng.uniform(50, 200, rows)
+    })
+
+
+def time_case(func, repeat, warmup=1):
+    for _ in range(warmup):
+        func()
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return {
+        "median_ms": statistics.median(durations) * 1000,
+        "min_ms": min(durations) * 1000,
+        "repeat": repeat
+    }
+
+
+def build_cases(model, numpy_model, max_rows_full):
+    """
+    Cas de benchmark : nom -> fonction(rows, seed) qui prépare les données
+    et renvoie la fonction à chronométrer (ou None si le cas ne s'applique pas)
+    """
+    def future_dates(rows, seed):
+        if rows > MAX_CONSECUTIVE_DAYS:
+            return None
+        return lambda: create_future_dates('1970-01-01', rows)
+
+    def regressors_without_target(rows, seed):
+        df = synthetic_series(rows, seed)[['ds']]
+        return lambda: add_regressors(df, include_target=False)
+
+    def regressors_with_target(rows, seed):
+        df = synthetic_series(rows, seed)
+        return lambda: add_regressors(df, include_target=True)
+
+    def predict(interval_mode, limit=None):
+        light_model = model_for_interval_mode(model, interval_mode)
+
+        def case(rows, seed):
+            if limit is not None and rows > limit:
+                return None
+            df = add_regressors(synthetic_series(rows, seed)[['ds']], include_target=False)
+            return lambda: light_model.predict(df)
+        return case
+
+    def predict_numpy(rows, seed):
+        df = add_regressors(synthetic_series(rows, seed)[['ds']], include_target=False)
+        return lambda: numpy_model.predict_frame(df)
+
+    def metrics(rows, seed):
+        rng = np.random.default_rng(seed)
+        y_true = rng.gamma(2.0, 500.0, rows)
+        y_pred = y_true + rng.normal(0, 100, rows)
+        return lambda: calculate_metrics(y_true, y_pred)
+
+    def metrics_sklearn(rows, seed):
+        # Référence de l'ancienne implémentation, si scikit-learn est installé
+        if importlib.util.find_spec("sklearn") is None:
+            return None
+        rng = np.random.default_rng(seed)
+        y_true = rng.gamma(2.0, 500.0, rows)
+        y_pred = y_true + rng.normal(0, 100, rows)
+        return lambda: sklearn_metrics(y_true, y_pred)
+
+    def render(rows, seed):
+        source = plot_source("forecast", synthetic_forecast(rows, seed), "Benchmark")
+        return lambda: render_png(source)
+
+    def chart(rows, seed):
+        source = plot_source("forecast", synthetic_forecast(rows, seed), "Benchmark")
+        return lambda: chart_data(source, max_points=1000)
+
+    def serialize(layout):
+        def case(rows, seed):
+            forecast = synthetic_forecast(rows, seed)
+            return lambda: serialize_frame(forecast, layout)
+        return case
+
+    def encode(rows, seed):
+        columns = serialize_frame(synthetic_forecast(rows, seed), "columns")
+        return lambda: FastJSONResponse(columns)
+
+    return {
+        "create_future_dates": future_dates,
+        "add_regressors": regressors_without_target,
+        "add_regressors_target": regressors_with_target,
+        "predict_none": predict("none"),
+        "predict_full": predict("full", max_rows_full),
+        "predict_numpy": predict_numpy,
+        "calculate_metrics": metrics,
+        "metrics_sklearn": metrics_sklearn,
+        "render_png": render,
+        "chart_data": chart,
+        "serialize_rows": serialize("rows"),
+        "serialize_columns": serialize("columns"),
+        "json_encode": encode,
+    }
+
+
+def environment():
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count()
+    }
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """
+    Comparer aux médianes de référence ; renvoie la liste des régressions
+    """
+    reference = {(r["case"], r["rows"]): r for r in baseline["results"]}
+    regressions = []
+    print(f"\n{'cas':<24} {'lignes':>9} {'référence':>11} {'actuel':>11} {'ratio':>7}")
+    for result in results:
+        ref = reference.get((result["case"], result["rows"]))
+        if ref is None or "error" in ref:
+            continue
+        if "error" in result:
+            print(f"{result['case']:<24} {result['rows']:>9} {ref['median_ms']:>9.2f}ms {'échec':>11}  RÉGRESSION")
+            regressions.append({**result, "baseline_ms": ref["median_ms"]})
+            continue
+        ratio = result["median_ms"] / ref["median_ms"] if ref["median_ms"] else float("inf")
+        regressed = ratio > 1 + threshold and result["median_ms"] - ref["median_ms"] >= min_delta_ms
+        flag = "  RÉGRESSION" if regressed else ""
+        print(f"{result['case']:<24} {result['rows']:>9} {ref['median_ms']:>9.2f}ms "
+              f"{result['median_ms']:>9.2f}ms {ratio:>6.2f}x{flag}")
+        if regressed:
+            regressions.append({**result, "baseline_ms": ref["median_ms"], "ratio": ratio})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="prophet_model.pkl")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--cases", nargs="+", default=None, help="défaut : tous les cas")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-repeat-rows", type=int, default=100_000,
+                        help="au-delà de cette taille, une seule mesure par cas")
+    parser.add_argument("--max-rows-full", type=int, default=10_000,
+                        help="taille maximale pour predict avec intervalles complets")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="fichier JSON des résultats")
+    parser.add_argument("--baseline", default=None, help="résultats de référence à comparer")
+    parser.add_argument("--threshold", type=float, default=0.25, help="régression si ratio > 1 + seuil")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="écart absolu minimal d'une régression")
+    args = parser.parse_args()
+
+    model = joblib.load(args.model)
+    numpy_model = NumpyProphet.from_model(model)
+    cases = build_cases(model, numpy_model, args.max_rows_full)
+    selected = args.cases or list(cases)
+    unknown = set(selected) - set(cases)
+    if unknown:
+        parser.error(f"cas inconnus: {', '.join(sorted(unknown))} (disponibles: {', '.join(cases)})")
+
+    results = []
+    print(f"{'cas':<24} {'lignes':>9} {'médiane':>11} {'min':>11}")
+    for name in selected:
+        for rows in args.sizes:
+            func = cases[name](rows, args.seed)
+            if func is None:
+                continue
+            repeat = args.repeat if rows < args.max_repeat_rows else 1
+            try:
+                timing = time_case(func, repeat, warmup=1 if rows < args.max_repeat_rows else 0)
+            except Exception as e:
+                # Un cas qui échoue (ex. limite de matplotlib) est signalé, pas ignoré
+                results.append({"case": name, "rows": rows, "error": f"{type(e).__name__}: {e}"})
+                print(f"{name:<24} {rows:>9}     échec : {type(e).__name__}: {e}")
+                continue
+            results.append({"case": name, "rows": rows, **timing})
+            print(f"{name:<24} {rows:>9} {timing['median_ms']:>9.2f}ms {timing['min_ms']:>9.2f}ms")
+
+    report = {"environment": environment(), "threshold": args.threshold, "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nRésultats écrits dans {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"\n{len(regressions)} régression(s) au-delà de +{args.threshold:.0%}")
+            sys.exit(1)
+        print("\nAucune régression")
+
+
+if __name__ == "__main__":
+    main()
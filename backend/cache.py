@@ -0,0 +1,122 @@
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def estimate_size(value):
+    """
+    Estimer la taille mémoire (en octets) d'une valeur mise en cache ; les
+    dictionnaires, listes et tuples (données d'un graphique, agrégats par
+    granularité) comptent la somme de leurs éléments
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, dict):
+        return 64 + sum(estimate_size(key) + estimate_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return 64 + sum(estimate_size(item) for item in value)
+    if isinstance(value, str):
+        return 64 + len(value)
+    if value is None or isinstance(value, (bool, int, float)):
+        return 32
+    return 1024
+
+
+class ForecastCache:
+    """
+    Cache LRU + TTL des prédictions, borné en nombre d'entrées et en mémoire.
+
+    Les clés sont préfixées par l'identité du modèle : quand un modèle est
+    libéré (rechargement, remplacement), ses entrées sont purgées
+    automatiquement. Avec model=None, les entrées ne dépendent d'aucun modèle.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024, ttl_seconds=600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # clé -> (expiration, taille, valeur)
+        self._models = {}  # id(modèle) -> finaliseur
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _model_token(self, model):
+        if model is None:
+            return None
+        token = id(model)
+        if token not in self._models:
+            # Purge des entrées quand le modèle est détruit, avant que son id
+            # ne puisse être réutilisé par un autre objet
+            self._models[token] = weakref.finalize(model, self.invalidate_model, token)
+        return token
+
+    def _pop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, model, key):
+        with self._lock:
+            full_key = (self._model_token(model), key)
+            entry = self._entries.get(full_key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, _, value = entry
+            if expires_at < time.monotonic():
+                self._pop(full_key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(full_key)
+            self.hits += 1
+            return value
+
+    def put(self, model, key, value):
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            full_key = (self._model_token(model), key)
+            if full_key in self._entries:
+                self._pop(full_key)
+            self._entries[full_key] = (time.monotonic() + self.ttl_seconds, size, value)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_model(self, token):
+        with self._lock:
+            for full_key in [k for k in self._entries if k[0] == token]:
+                self._pop(full_key)
+            self._models.pop(token, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / total if total else 0.0
+            }
@@ -0,0 +1,80 @@
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Plage couverte par la table précalculée
+CALENDAR_START = np.datetime64('1970-01-01', 'D')
+CALENDAR_END = np.datetime64('2100-12-31', 'D')
+
+# Colonnes calendaires et type renvoyé (celui des accesseurs .dt de pandas)
+CALENDAR_COLUMNS = {
+    'day_of_week': np.int32,
+    'day_of_month': np.int32,
+    'week_of_year': np.int32,
+    'month': np.int32,
+    'quarter': np.int32,
+    'is_weekend': np.int64,
+    'is_month_start': np.int64,
+    'is_month_end': np.int64,
+    'is_summer': np.int64,
+    'is_christmas_season': np.int64,
+    'is_back_to_school': np.int64,
+}
+
+
+def compute_calendar_features(ds):
+    """
+    Calculer les variables calendaires d'une série de dates avec pandas
+    """
+    month = ds.dt.month
+    day_of_month = ds.dt.day
+    return {
+        'day_of_week': ds.dt.dayofweek,
+        'day_of_month': day_of_month,
+        'week_of_year': ds.dt.isocalendar().week,
+        'month': month,
+        'quarter': ds.dt.quarter,
+        'is_weekend': (ds.dt.dayofweek >= 5).astype(int),
+        'is_month_start': (day_of_month <= 7).astype(int),
+        'is_month_end': (day_of_month >= 24).astype(int),
+        # Saisons et événements
+        'is_summer': month.isin([6, 7, 8]).astype(int),
+        'is_christmas_season': month.isin([11, 12]).astype(int),
+        'is_back_to_school': (
+            (month == 8) |
+            ((month == 9) & (day_of_month <= 15))
+        ).astype(int),
+    }
+
+
+@lru_cache(maxsize=1)
+def calendar_table():
+    """
+    Matrice int8 (jours x colonnes) des variables calendaires, indexée par
+    le nombre de jours depuis CALENDAR_START (environ 0,5 Mo)
+    """
+    dates = pd.Series(pd.date_range(CALENDAR_START, CALENDAR_END, freq='D'))
+    features = compute_calendar_features(dates)
+    return np.column_stack([
+        np.asarray(features[name], dtype=np.int8) for name in CALENDAR_COLUMNS
+    ])
+
+
+def calendar_features(ds):
+    """
+    Variables calendaires d'une série de dates, lues dans la table
+    précalculée. Retour au calcul pandas pour les dates hors plage ou
+    manquantes.
+    """
+    days = ds.to_numpy(dtype='datetime64[ns]').astype('datetime64[D]')
+    offsets = (days - CALENDAR_START).astype(np.int64)
+    table = calendar_table()
+    if len(offsets) and (np.isnat(days).any() or offsets.min() < 0 or offsets.max() >= len(table)):
+        return compute_calendar_features(ds)
+
+    rows = table[offsets]
+    return {
+        name: rows[:, j].astype(dtype)
+        for j, (name, dtype) in enumerate(CALENDAR_COLUMNS.items())
+    }
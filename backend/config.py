@@ -0,0 +1,69 @@
+import os
+
+# Paramètres de l'API, surchargeables par variables d'environnement
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+# Cache des prédictions (LRU + TTL)
+FORECAST_CACHE_MAX_ENTRIES = _env_int("FORECAST_CACHE_MAX_ENTRIES", 256)
+FORECAST_CACHE_MAX_BYTES = _env_int("FORECAST_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+FORECAST_CACHE_TTL_SECONDS = _env_float("FORECAST_CACHE_TTL_SECONDS", 600)
+
+# Table de prédictions précalculée au chargement du modèle
+FORECAST_TABLE_ENABLED = os.getenv("FORECAST_TABLE_ENABLED", "1") == "1"
+FORECAST_TABLE_START = os.getenv("FORECAST_TABLE_START")  # défaut : début de l'historique
+FORECAST_TABLE_END = os.getenv("FORECAST_TABLE_END")  # défaut : fin de l'historique + horizon
+FORECAST_TABLE_HORIZON_DAYS = _env_int("FORECAST_TABLE_HORIZON_DAYS", 730)
+
+# Pool d'exécution des traitements bloquants (prédiction, lecture CSV, graphiques)
+EXECUTOR_KIND = os.getenv("EXECUTOR_KIND", "thread")  # "thread" ou "process"
+EXECUTOR_MAX_WORKERS = _env_int("EXECUTOR_MAX_WORKERS", os.cpu_count() or 1)
+EXECUTOR_MAX_IN_FLIGHT = _env_int("EXECUTOR_MAX_IN_FLIGHT", EXECUTOR_MAX_WORKERS)
+EXECUTOR_MAX_QUEUE = _env_int("EXECUTOR_MAX_QUEUE", 32)
+EXECUTOR_RETRY_AFTER_SECONDS = _env_int("EXECUTOR_RETRY_AFTER_SECONDS", 1)
+
+# Nombre d'échantillons d'incertitude du mode d'intervalle "fast"
+FAST_UNCERTAINTY_SAMPLES = _env_int("FAST_UNCERTAINTY_SAMPLES", 100)
+
+# Moteur des prédictions ponctuelles : "prophet" (model.predict) ou "numpy"
+FORECAST_ENGINE = os.getenv("FORECAST_ENGINE", "prophet")
+
+# Graphiques rendus à la demande (/plot/{forecast_id})
+PLOT_DPI = _env_int("PLOT_DPI", 100)
+PLOT_CACHE_MAX_ENTRIES = _env_int("PLOT_CACHE_MAX_ENTRIES", 512)
+PLOT_CACHE_MAX_BYTES = _env_int("PLOT_CACHE_MAX_BYTES", 128 * 1024 * 1024)
+PLOT_CACHE_TTL_SECONDS = _env_float("PLOT_CACHE_TTL_SECONDS", 1800)
+
+# Séries des graphiques tracés côté client (chart=true, /chart/{forecast_id})
+CHART_MAX_POINTS = _env_int("CHART_MAX_POINTS", 1000)
+
+# Fichiers envoyés à /predict-csv
+MAX_UPLOAD_BYTES = _env_int("MAX_UPLOAD_BYTES", 512 * 1024 * 1024)
+MAX_UPLOAD_DECOMPRESSED_BYTES = _env_int("MAX_UPLOAD_DECOMPRESSED_BYTES", 4 * 1024 * 1024 * 1024)
+CSV_CHUNK_ROWS = _env_int("CSV_CHUNK_ROWS", 100_000)
+
+# Nombre maximal de fenêtres par appel à /predict-batch
+BATCH_MAX_WINDOWS = _env_int("BATCH_MAX_WINDOWS", 1000)
+BATCH_MAX_WINDOW_DAYS = _env_int("BATCH_MAX_WINDOW_DAYS", 3660)  # jours par fenêtre
+BATCH_MAX_TOTAL_DAYS = _env_int("BATCH_MAX_TOTAL_DAYS", 100_000)  # somme des periods d'un appel
+
+# Modèles : modèle global et modèles par segment (product_line, category, group, supplier)
+MODEL_PATH = os.getenv("MODEL_PATH", "prophet_model.pkl")
+MODEL_DIR = os.getenv("MODEL_DIR", "models")
+MODEL_REGISTRY_MAX_BYTES = _env_int("MODEL_REGISTRY_MAX_BYTES", 2 * 1024 * 1024 * 1024)
+PRODUCT_SUPPLIER_CSV = os.getenv("PRODUCT_SUPPLIER_CSV", "../dataset/product-supplier.csv")
+
+# Rechargement à chaud : surveillance de MODEL_PATH et du manifeste (0 = désactivée)
+# et jeton attendu dans l'en-tête X-Admin-Token de /models/reload (vide = pas de contrôle)
+MODEL_WATCH_INTERVAL_SECONDS = _env_float("MODEL_WATCH_INTERVAL_SECONDS", 0)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Tâches de fond (/backtest) : tâches simultanées, tâches terminées conservées
+# et processus du pool d'un backtest
+JOBS_MAX_RUNNING = _env_int("JOBS_MAX_RUNNING", 1)
+JOBS_MAX_RETAINED = _env_int("JOBS_MAX_RETAINED", 50)
+BACKTEST_WORKERS = _env_int("BACKTEST_WORKERS", os.cpu_count() or 1)
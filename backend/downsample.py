@@ -0,0 +1,58 @@
+"""
+Réduction des séries envoyées aux graphiques du frontend.
+
+LTTB (Largest-Triangle-Three-Buckets, Steinarsson 2013) garde le premier et
+le dernier point, puis, dans chaque tranche intermédiaire, le point qui forme
+le plus grand triangle avec le point retenu précédemment et la moyenne de la
+tranche suivante : pics, creux et ruptures de pente sont conservés, là où un
+simple sous-échantillonnage régulier les perdrait.
+"""
+import numpy as np
+import pandas as pd
+
+
+def lttb_indices(x, y, max_points):
+    """
+    Indices (triés) des points retenus par LTTB, au plus `max_points`.
+    Les points où y vaut NaN sont ignorés.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    valid = np.flatnonzero(~np.isnan(y))
+    n = len(valid)
+    if max_points >= n or max_points < 3:
+        return valid
+    x, y = x[valid], y[valid]
+
+    # Bornes des max_points - 2 tranches entre le premier et le dernier point
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+
+    # Moyenne de chaque tranche, calculée d'un coup ; la dernière tranche
+    # a pour « suivante » le dernier point
+    counts = np.diff(edges)
+    mean_x = np.append(np.add.reduceat(x[:n - 1], edges[:-1]) / counts, x[n - 1])
+    mean_y = np.append(np.add.reduceat(y[:n - 1], edges[:-1]) / counts, y[n - 1])
+
+    previous = 0
+    for i in range(max_points - 2):
+        start, end = edges[i], edges[i + 1]
+        px, py = x[previous], y[previous]
+        # Double de l'aire du triangle (point précédent, candidat, moyenne suivante)
+        area = np.abs((px - mean_x[i + 1]) * (y[start:end] - py) - (px - x[start:end]) * (mean_y[i + 1] - py))
+        previous = start + int(area.argmax())
+        selected[i + 1] = previous
+
+    return valid[selected]
+
+
+def downsample_frame(df, value_column, max_points, date_column='ds'):
+    """
+    Lignes de `df` retenues par LTTB sur (date, valeur) ; df inchangé s'il
+    tient déjà dans le budget
+    """
+    if max_points is None or len(df) <= max_points:
+        return df
+    x = pd.to_datetime(df[date_column]).to_numpy().astype('datetime64[s]').astype(np.int64)
+    return df.iloc[lttb_indices(x, df[value_column].to_numpy(), max_points)]
@@ -0,0 +1,130 @@
+import asyncio
+import contextvars
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from fastapi import HTTPException
+
+from metrics import record_stage, run_with_timings
+
+
+class Overloaded(HTTPException):
+    """Réponse 503 renvoyée quand la file d'attente du pool est pleine"""
+
+    def __init__(self, retry_after):
+        super().__init__(
+            status_code=503,
+            detail="Serveur surchargé, réessayez plus tard",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+
+class WorkerPool:
+    """
+    Exécute les traitements bloquants (Prophet, pandas, matplotlib) hors de
+    la boucle asyncio, dans un pool de threads ou de processus.
+
+    Au plus `max_in_flight` traitements tournent en même temps et au plus
+    `max_queue` requêtes attendent une place ; au-delà, la requête est
+    rejetée avec un 503 et un en-tête Retry-After.
+    """
+
+    def __init__(self, kind="thread", max_workers=4, max_in_flight=4, max_queue=32, retry_after=1):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Type de pool inconnu: {kind}")
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.waiting = 0
+        self._executor = None
+        self._semaphore = None
+
+    def _get_executor(self):
+        # Création paresseuse : un processus fils qui réimporte l'application
+        # ne démarre pas de pool à son tour
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="forecast"
+                )
+        return self._executor
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Exécuter `func(*args, **kwargs)` dans le pool et attendre son résultat
+        """
+        return await self._submit(self._get_executor(), func, *args, **kwargs)
+
+    async def run_in_thread(self, func, *args, **kwargs):
+        """
+        Comme run, mais toujours dans un thread (pool par défaut de la boucle) :
+        pour les traitements qui lisent des objets non transférables vers un
+        autre processus, comme un fichier envoyé. Les limites de charge
+        s'appliquent de la même façon.
+        """
+        return await self._submit(None, func, *args, **kwargs)
+
+    async def _submit(self, executor, func, *args, **kwargs):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            raise Overloaded(self.retry_after)
+
+        self.waiting += 1
+        queued_at = time.perf_counter()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        record_stage("queue", time.perf_counter() - queued_at)
+
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            if isinstance(executor, ProcessPoolExecutor):
+                # Les durées des étapes mesurées dans le processus reviennent avec le résultat
+                result, timings = await loop.run_in_executor(
+                    executor, functools.partial(run_with_timings, func, *args, **kwargs)
+                )
+                for name, seconds in timings:
+                    record_stage(name, seconds)
+                return result
+            # Un thread ne reçoit pas le contexte de la requête sans copie explicite
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(executor, functools.partial(context.run, func, *args, **kwargs))
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self):
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue
+        }
+
+    def recycle(self):
+        """
+        Remplacer les processus du pool (après un rechargement du modèle) :
+        les traitements en cours terminent dans les anciens processus, les
+        suivants partent dans des processus neufs qui chargent le nouveau
+        modèle. Sans effet pour un pool de threads, qui partage le registre.
+        """
+        if self.kind != "process" or self._executor is None:
+            return
+        old_executor, self._executor = self._executor, None
+        old_executor.shutdown(wait=False)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+
+from utils import create_future_dates, add_regressors
+
+DAY = np.timedelta64(1, 'D')
+
+
+class ForecastTable:
+    """
+    Table dense des prédictions journalières (yhat, yhat_lower, yhat_upper).
+
+    La prédiction de Prophet pour une date ne dépend pas de la fenêtre
+    demandée : on calcule donc une fois toute la plage au chargement du
+    modèle, puis chaque requête est servie par un simple découpage des
+    tableaux NumPy.
+    """
+
+    def __init__(self, start, yhat, yhat_lower, yhat_upper):
+        self.start = np.datetime64(pd.Timestamp(start).normalize(), 'D')
+        self.yhat = yhat
+        self.yhat_lower = yhat_lower
+        self.yhat_upper = yhat_upper
+        self.days = len(yhat)
+        self.end = self.start + (self.days - 1) * DAY
+
+    @classmethod
+    def build(cls, model, start=None, end=None, horizon_days=730):
+        """
+        Calculer la table sur [start, end] ; par défaut du début de
+        l'historique jusqu'à `horizon_days` jours après sa fin
+        """
+        history = getattr(model, 'history', None)
+        if start is None:
+            start = history['ds'].min()
+        start = pd.Timestamp(start).normalize()
+        if end is None:
+            end = history['ds'].max() + pd.Timedelta(days=horizon_days)
+        end = pd.Timestamp(end).normalize()
+        periods = (end - start).days + 1
+        if periods <= 0:
+            raise ValueError("Plage de la table de prédictions vide")
+
+        future_enriched = add_regressors(create_future_dates(start, periods), include_target=False)
+        forecast = model.predict(future_enriched)
+
+        def column(name):
+            if name in forecast.columns:
+                return forecast[name].to_numpy(dtype=np.float64)
+            return np.full(periods, np.nan)
+
+        return cls(start, column('yhat'), column('yhat_lower'), column('yhat_upper'))
+
+    def lookup(self, start_date, periods, with_intervals=True):
+        """
+        Extraire la fenêtre [start_date, start_date + periods[ de la table,
+        ou None si elle n'est pas entièrement couverte
+        """
+        start = pd.Timestamp(start_date)
+        if start != start.normalize() or periods <= 0:
+            return None
+        offset = int((np.datetime64(start, 'D') - self.start) // DAY)
+        if offset < 0 or offset + periods > self.days:
+            return None
+        window = slice(offset, offset + periods)
+        columns = {
+            'ds': pd.date_range(start=start, periods=periods, freq='D'),
+            'yhat': self.yhat[window]
+        }
+        if with_intervals:
+            columns['yhat_lower'] = self.yhat_lower[window]
+            columns['yhat_upper'] = self.yhat_upper[window]
+        return pd.DataFrame(columns)
+
+    def take(self, dates, with_intervals=True):
+        """
+        Extraire des dates quelconques (tableau datetime64) de la table,
+        ou None si l'une d'elles n'est pas couverte
+        """
+        days = np.asarray(dates, dtype='datetime64[D]')
+        offsets = (days - self.start) // DAY
+        if len(offsets) == 0 or offsets.min() < 0 or offsets.max() >= self.days:
+            return None
+        columns = {
+            'ds': days.astype('datetime64[ns]'),
+            'yhat': self.yhat[offsets]
+        }
+        if with_intervals:
+            columns['yhat_lower'] = self.yhat_lower[offsets]
+            columns['yhat_upper'] = self.yhat_upper[offsets]
+        return pd.DataFrame(columns)
+
+    def nbytes(self):
+        return self.yhat.nbytes + self.yhat_lower.nbytes + self.yhat_upper.nbytes
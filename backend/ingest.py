@@ -0,0 +1,221 @@
+import gzip
+import io
+import zlib
+
+import pandas as pd
+
+# Noms de colonnes acceptés -> colonnes Prophet
+COLUMN_MAPPING = {
+    "Date Order was placed": "ds",
+    "Total Retail Price for This Order": "y",
+    "date": "ds",
+    "sales": "y"
+}
+
+# Colonnes lues dans un fichier envoyé : noms acceptés et noms Prophet déjà normalisés
+UPLOAD_COLUMNS = set(COLUMN_MAPPING) | set(COLUMN_MAPPING.values())
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+PARQUET_MAGIC = b"PAR1"
+ARROW_FILE_MAGIC = b"ARROW1"
+ARROW_STREAM_MAGIC = b"\xff\xff\xff\xff"  # marqueur de continuation du premier message
+
+# Types MIME des formats colonnes (Content-Type de la partie du formulaire)
+UPLOAD_CONTENT_TYPES = {
+    "application/vnd.apache.parquet": "parquet",
+    "application/x-parquet": "parquet",
+    "application/vnd.apache.arrow.file": "arrow_file",
+    "application/vnd.apache.arrow.stream": "arrow_stream",
+}
+
+
+class UploadTooLarge(ValueError):
+    """Fichier envoyé (ou décompressé) plus gros que la limite configurée"""
+
+
+class LimitedReader(io.RawIOBase):
+    """
+    Flux binaire qui lève UploadTooLarge au-delà de `max_bytes` octets lus
+    """
+
+    def __init__(self, raw, max_bytes, label="Fichier"):
+        self._raw = raw
+        self.max_bytes = max_bytes
+        self.label = label
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._raw.read(len(buffer))
+        n = len(data)
+        self.bytes_read += n
+        if self.bytes_read > self.max_bytes:
+            raise UploadTooLarge(f"{self.label} trop volumineux (limite: {self.max_bytes} octets)")
+        buffer[:n] = data
+        return n
+
+
+def open_upload(fileobj, max_bytes, max_decompressed_bytes):
+    """
+    Ouvrir un fichier envoyé en flux binaire, décompressé à la volée
+    (gzip ou zstd, détectés par leur signature) et borné en taille.
+    Le zstd demande le paquet optionnel `zstandard`, absent de
+    requirements.txt : sans lui, un fichier zstd est refusé (400).
+    """
+    magic = _peek(fileobj, 4)
+    stream = io.BufferedReader(LimitedReader(fileobj, max_bytes))
+    if magic.startswith(GZIP_MAGIC):
+        stream = gzip.GzipFile(fileobj=stream, mode="rb")
+    elif magic.startswith(ZSTD_MAGIC):
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("Fichier compressé en zstd : installez le paquet 'zstandard'")
+        stream = zstandard.ZstdDecompressor().stream_reader(stream)
+    else:
+        return stream
+    return io.BufferedReader(LimitedReader(stream, max_decompressed_bytes, label="Fichier décompressé"))
+
+
+def _read_errors():
+    """
+    Exceptions d'un fichier tronqué ou corrompu (gzip, zlib, zstd, E/S)
+    """
+    errors = (EOFError, OSError, zlib.error)
+    try:
+        import zstandard
+    except ImportError:
+        return errors
+    return errors + (zstandard.ZstdError,)
+
+
+def _peek(fileobj, size):
+    if hasattr(fileobj, "peek"):
+        return fileobj.peek(size)[:size]
+    position = fileobj.tell()
+    data = fileobj.read(size)
+    fileobj.seek(position)
+    return data
+
+
+def upload_format(fileobj, content_type=None):
+    """
+    Format d'un fichier envoyé : "csv", "parquet", "arrow_file" ou
+    "arrow_stream", d'après son Content-Type puis sa signature
+    """
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in UPLOAD_CONTENT_TYPES:
+        return UPLOAD_CONTENT_TYPES[media_type]
+    magic = _peek(fileobj, 6)
+    if magic.startswith(PARQUET_MAGIC):
+        return "parquet"
+    if magic.startswith(ARROW_FILE_MAGIC):
+        return "arrow_file"
+    if magic.startswith(ARROW_STREAM_MAGIC):
+        return "arrow_stream"
+    return "csv"
+
+
+def normalize_columns(chunk):
+    """
+    Renommer les colonnes vers 'ds' / 'y' et vérifier leur présence
+    """
+    chunk = chunk.rename(columns={c: COLUMN_MAPPING[c] for c in chunk.columns if c in COLUMN_MAPPING})
+
+    if 'ds' not in chunk.columns:
+        raise ValueError("Colonne de date introuvable. Noms acceptés: 'Date Order was placed', 'date', 'ds'")
+
+    if 'y' not in chunk.columns:
+        raise ValueError("Colonne de ventes introuvable. Noms acceptés: 'Total Retail Price for This Order', 'sales', 'y'")
+
+    return chunk
+
+
+def daily_totals(chunk):
+    """
+    Ventes totales par jour d'un morceau de fichier
+    """
+    ds = pd.to_datetime(chunk['ds']).dt.normalize()
+    y = pd.to_numeric(chunk['y'])
+    return y.groupby(ds).sum()
+
+
+def _csv_chunks(fileobj, max_bytes, max_decompressed_bytes, chunk_rows):
+    stream = open_upload(fileobj, max_bytes, max_decompressed_bytes)
+    reader = pd.read_csv(
+        stream,
+        encoding="utf-8-sig",
+        usecols=lambda column: column in UPLOAD_COLUMNS,
+        chunksize=chunk_rows
+    )
+    with reader:
+        yield from reader
+
+
+def _arrow_chunks(fileobj, fmt, max_bytes, chunk_rows):
+    """
+    Lots d'un fichier Parquet ou Arrow IPC, en ne lisant que les colonnes utiles
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Fichier Parquet / Arrow : installez le paquet 'pyarrow'")
+
+    # Ces formats se lisent en accès direct : la taille est vérifiée d'avance
+    position = fileobj.tell()
+    size = fileobj.seek(0, io.SEEK_END) - position
+    fileobj.seek(position)
+    if size > max_bytes:
+        raise UploadTooLarge(f"Fichier trop volumineux (limite: {max_bytes} octets)")
+
+    source = pa.PythonFile(fileobj, mode="r")
+    if fmt == "parquet":
+        parquet_file = pq.ParquetFile(source)
+        columns = [name for name in parquet_file.schema_arrow.names if name in UPLOAD_COLUMNS]
+        batches = parquet_file.iter_batches(batch_size=chunk_rows, columns=columns)
+    elif fmt == "arrow_file":
+        reader = pa.ipc.open_file(source)
+        columns = [name for name in reader.schema.names if name in UPLOAD_COLUMNS]
+        batches = (reader.get_batch(i).select(columns) for i in range(reader.num_record_batches))
+    else:
+        reader = pa.ipc.open_stream(source)
+        columns = [name for name in reader.schema.names if name in UPLOAD_COLUMNS]
+        batches = (batch.select(columns) for batch in reader)
+
+    for batch in batches:
+        yield batch.to_pandas()
+
+
+def read_daily_series(fileobj, max_bytes, max_decompressed_bytes, chunk_rows=100_000, content_type=None):
+    """
+    Lire un fichier de ventes par morceaux et l'agréger en série
+    journalière (ds, y). CSV (éventuellement compressé), Parquet et Arrow
+    IPC (fichier ou flux) sont acceptés, voir upload_format.
+
+    Seules les colonnes utiles sont lues et chaque morceau est réduit dès sa
+    lecture : la mémoire dépend du nombre de dates distinctes, pas de la
+    taille du fichier.
+    """
+    fmt = upload_format(fileobj, content_type)
+    if fmt == "csv":
+        chunks = _csv_chunks(fileobj, max_bytes, max_decompressed_bytes, chunk_rows)
+    else:
+        chunks = _arrow_chunks(fileobj, fmt, max_bytes, chunk_rows)
+
+    totals = None
+    try:
+        for chunk in chunks:
+            chunk_totals = daily_totals(normalize_columns(chunk))
+            totals = chunk_totals if totals is None else totals.add(chunk_totals, fill_value=0)
+    except _read_errors() as e:
+        raise ValueError(f"Fichier illisible (tronqué ou corrompu): {e}") from e
+
+    if totals is None or totals.empty:
+        raise ValueError("Le fichier ne contient aucune ligne")
+
+    totals = totals.sort_index()
+    return pd.DataFrame({'ds': totals.index, 'y': totals.to_numpy()})
@@ -0,0 +1,82 @@
+import asyncio
+import functools
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+
+class JobStore:
+    """
+    Tâches de fond longues (backtest, réentraînement) lancées par l'API et
+    suivies par identifiant.
+
+    Chaque tâche tourne dans un thread du pool par défaut de la boucle, hors
+    du WorkerPool des requêtes : elle n'occupe pas de place de prédiction.
+    Au plus `max_running` tâches tournent en même temps, les autres restent
+    en file ("queued"). Seules les `max_jobs` dernières tâches terminées
+    sont conservées.
+    """
+
+    def __init__(self, max_jobs=50, max_running=1):
+        self.max_jobs = max_jobs
+        self.max_running = max_running
+        self._jobs = OrderedDict()
+        self._tasks = set()
+        self._semaphore = None
+
+    def submit(self, kind, func, *args, **kwargs):
+        """
+        Planifier `func(*args, **kwargs)` et renvoyer la description de la tâche
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_running)
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "status": "queued",
+            "submitted_at": datetime.now().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None
+        }
+        self._jobs[job["id"]] = job
+        self._evict()
+        task = asyncio.create_task(self._run(job, functools.partial(func, *args, **kwargs)))
+        # Garder une référence : la boucle ne conserve que des références faibles
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _run(self, job, call):
+        async with self._semaphore:
+            job["status"] = "running"
+            job["started_at"] = datetime.now().isoformat()
+            try:
+                job["result"] = await asyncio.get_running_loop().run_in_executor(None, call)
+                job["status"] = "done"
+            except Exception as e:
+                job["status"] = "failed"
+                job["error"] = str(e)
+            finally:
+                job["finished_at"] = datetime.now().isoformat()
+
+    def _evict(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] in ("done", "failed")]
+        for job_id in finished[:max(0, len(self._jobs) - self.max_jobs)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def list(self, kind=None):
+        return [
+            {key: value for key, value in job.items() if key != "result"}
+            for job in self._jobs.values() if kind is None or job["kind"] == kind
+        ]
+
+    def stats(self):
+        counts = {}
+        for job in self._jobs.values():
+            counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return counts
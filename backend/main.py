@@ -1,24 +1,42 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import joblib
+from fastapi.responses import JSONResponse, Response
+from starlette.routing import Match
 import pandas as pd
+import asyncio
 import base64
+import time
 import io
+import os
 import json
-import matplotlib.pyplot as plt
-import seaborn as sns
+import uuid
 from datetime import datetime
+from typing import Optional
 import numpy as np
 
-from models import ForecastRequest, ForecastResponse, CSVForecastRequest
-from utils import create_future_dates, add_regressors, calculate_metrics
+from models import (ForecastRequest, ForecastResponse, CSVForecastRequest, BatchForecastRequest, AggregateForecastRequest,
+                    BacktestRequest, RefitRequest, IntervalMode, ResponseLayout)
+from utils import create_future_dates, add_regressors, calculate_metrics, model_for_interval_mode
+from cache import ForecastCache
+from executor import WorkerPool
+from jobs import JobStore
+from registry import ModelRegistry, load_segments, model_version
+from plots import plot_source, render_png, chart_data
+from aggregation import period_window, aggregate_periods
+from ingest import read_daily_series, UploadTooLarge
+from serialization import (FastJSONResponse, TimedJSONResponse, ArrowStreamResponse, serialize_frame, columns_to_rows,
+                           numbers_to_list, negotiate_format, frame_to_arrow, FORECAST_FIELDS)
+from metrics import (stage, start_request, server_timing, registry as metrics_registry, REQUESTS, REQUEST_SECONDS,
+                     IN_FLIGHT, REQUEST_BYTES, RESPONSE_BYTES, REFIT_SECONDS, WORKERS, CACHE_HIT_RATIO, CACHE_ENTRIES,
+                     CACHE_BYTES)
+import config
 
 # Initialiser l'application
 app = FastAPI(
     title="API de Prédiction des Ventes",
     description="API pour prédire les ventes des 3 prochains mois",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=TimedJSONResponse
 )
 
 # Configurer CORS
@@ -30,13 +48,247 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Charger le modèle
+@app.middleware("http")
+async def reject_large_uploads(request, call_next):
+    """
+    Refuser les envois trop volumineux d'après Content-Length, avant de lire le corps
+    """
+    content_length = request.headers.get("content-length")
+    if content_length is not None and content_length.isdigit() and int(content_length) > config.MAX_UPLOAD_BYTES:
+        return JSONResponse(
+            status_code=413,
+            content={
+                "success": False,
+                "error": f"Fichier trop volumineux (limite: {config.MAX_UPLOAD_BYTES} octets)"
+            }
+        )
+    return await call_next(request)
+
+def route_template(scope):
+    """
+    Chemin déclaré de la route (ex. '/plot/{forecast_id}'), pour des labels de métriques bornés
+    """
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "other"
+
+@app.middleware("http")
+async def instrument_requests(request, call_next):
+    """
+    Compter et chronométrer chaque requête ; détail par étape dans l'en-tête Server-Timing
+    """
+    endpoint = route_template(request.scope)
+    timings = start_request()
+    IN_FLIGHT.inc(endpoint=endpoint)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - start
+        IN_FLIGHT.dec(endpoint=endpoint)
+        REQUESTS.inc(endpoint=endpoint, method=request.method, status=str(status))
+        REQUEST_SECONDS.observe(elapsed, endpoint=endpoint)
+
+    request_length = request.headers.get("content-length")
+    if request_length is not None and request_length.isdigit():
+        REQUEST_BYTES.observe(int(request_length), endpoint=endpoint)
+    response_length = response.headers.get("content-length")
+    if response_length is not None and response_length.isdigit():
+        RESPONSE_BYTES.observe(int(response_length), endpoint=endpoint)
+    response.headers["Server-Timing"] = server_timing(timings, elapsed)
+    return response
+
+# Registre des modèles : modèle global + modèles par segment chargés à la demande
+try:
+    known_segments = load_segments(config.PRODUCT_SUPPLIER_CSV)
+except Exception as e:
+    print(f"Catalogue des segments indisponible: {e}")
+    known_segments = None
+
+registry = ModelRegistry(
+    config.MODEL_DIR,
+    max_bytes=config.MODEL_REGISTRY_MAX_BYTES,
+    build_options={
+        "engine": config.FORECAST_ENGINE,
+        "table_enabled": config.FORECAST_TABLE_ENABLED,
+        "table_start": config.FORECAST_TABLE_START,
+        "table_end": config.FORECAST_TABLE_END,
+        "table_horizon_days": config.FORECAST_TABLE_HORIZON_DAYS
+    },
+    segments=known_segments
+)
+
+# Charger le modèle global (pickle ou artefact allégé, voir artifact.py)
 try:
-    model = joblib.load("prophet_model.pkl")
-    print("Modèle chargé avec succès")
+    registry.load_default(config.MODEL_PATH)
+    print(f"Modèle chargé avec succès en {registry.default.load_seconds:.2f}s "
+          f"(+ préchauffage {registry.default.warm_seconds:.2f}s)")
 except Exception as e:
     print(f"Erreur lors du chargement du modèle: {e}")
-    model = None
+
+# Pool des traitements bloquants, pour ne pas geler la boucle asyncio
+worker_pool = WorkerPool(
+    kind=config.EXECUTOR_KIND,
+    max_workers=config.EXECUTOR_MAX_WORKERS,
+    max_in_flight=config.EXECUTOR_MAX_IN_FLIGHT,
+    max_queue=config.EXECUTOR_MAX_QUEUE,
+    retry_after=config.EXECUTOR_RETRY_AFTER_SECONDS
+)
+
+# Tâches longues lancées par l'API (backtests, réajustements), hors du pool des requêtes
+jobs = JobStore(max_jobs=config.JOBS_MAX_RETAINED, max_running=config.JOBS_MAX_RUNNING)
+
+@app.on_event("shutdown")
+async def shutdown_worker_pool():
+    worker_pool.shutdown()
+
+async def reload_models():
+    """
+    Recharger les modèles dont le fichier a changé, sans interrompre les
+    requêtes en cours
+    """
+    changed = await worker_pool.run_in_thread(registry.reload)
+    if changed:
+        print(f"Modèles rechargés: {changed}")
+        worker_pool.recycle()
+    return changed
+
+async def watch_models():
+    """
+    Surveiller MODEL_PATH et le manifeste des segments, et recharger à chaque changement
+    """
+    state = registry.watched_state()
+    while True:
+        await asyncio.sleep(config.MODEL_WATCH_INTERVAL_SECONDS)
+        current = registry.watched_state()
+        if current == state:
+            continue
+        state = current
+        try:
+            await reload_models()
+        except Exception as e:
+            print(f"Erreur lors du rechargement des modèles: {e}")
+
+@app.on_event("startup")
+async def start_model_watcher():
+    if config.MODEL_WATCH_INTERVAL_SECONDS > 0:
+        app.state.model_watcher = asyncio.create_task(watch_models())
+
+# Données et images des graphiques, par identifiant de prédiction
+plot_cache = ForecastCache(
+    max_entries=config.PLOT_CACHE_MAX_ENTRIES,
+    max_bytes=config.PLOT_CACHE_MAX_BYTES,
+    ttl_seconds=config.PLOT_CACHE_TTL_SECONDS
+)
+
+# Cache des prédictions par fenêtre (start_date, periods)
+forecast_cache = ForecastCache(
+    max_entries=config.FORECAST_CACHE_MAX_ENTRIES,
+    max_bytes=config.FORECAST_CACHE_MAX_BYTES,
+    ttl_seconds=config.FORECAST_CACHE_TTL_SECONDS
+)
+
+def predict_with_mode(bundle, df, interval_mode="full"):
+    """
+    Appeler le modèle en ne payant que les intervalles demandés
+    """
+    with stage("predict"):
+        if interval_mode == "none" and bundle.numpy_model is not None:
+            return bundle.numpy_model.predict_frame(df)
+        light_model = model_for_interval_mode(bundle.get_model(), interval_mode, config.FAST_UNCERTAINTY_SAMPLES)
+        return light_model.predict(df)
+
+def forecast_window(bundle, start_date, periods, interval_mode="full"):
+    """
+    Prédire les ventes sur une fenêtre de dates : lecture dans la table
+    précalculée si possible, sinon prédiction du modèle mise en cache
+    """
+    if bundle.forecast_table is not None:
+        with stage("table_lookup"):
+            forecast = bundle.forecast_table.lookup(start_date, periods, with_intervals=interval_mode != "none")
+        if forecast is not None:
+            return forecast
+
+    key = (bundle.version, pd.to_datetime(start_date), periods, interval_mode)
+    forecast = forecast_cache.get(bundle, key)
+    if forecast is None:
+        with stage("add_regressors"):
+            future_df = create_future_dates(start_date, periods)
+            future_enriched = add_regressors(future_df, include_target=False)
+        forecast = predict_with_mode(bundle, future_enriched, interval_mode)
+        forecast_cache.put(bundle, key, forecast)
+    return forecast
+
+def posterior_samples(bundle, df, interval_mode="full"):
+    """
+    Trajectoires simulées par le modèle (jours x échantillons), au nombre
+    d'échantillons du mode d'intervalle demandé
+    """
+    with stage("predict"):
+        light_model = model_for_interval_mode(bundle.get_model(), interval_mode, config.FAST_UNCERTAINTY_SAMPLES)
+        return light_model.predictive_samples(df)['yhat']
+
+def aggregate_window(bundle, start_date, periods, granularities, interval_mode="full"):
+    """
+    Prédictions agrégées sur `periods` périodes complètes de la première
+    granularité, détaillées pour chaque granularité demandée.
+
+    Les totaux viennent de la prédiction ponctuelle (table ou cache) et les
+    intervalles d'un seul tirage de trajectoires, partagé par toutes les
+    granularités. Renvoie (premier jour, {granularité: DataFrame}).
+    """
+    first, last = period_window(start_date, periods, granularities[0])
+    days = (last - first).days + 1
+    key = (bundle.version, "aggregate", first, days, tuple(granularities), interval_mode)
+    result = forecast_cache.get(bundle, key)
+    if result is None:
+        forecast = forecast_window(bundle, first.strftime('%Y-%m-%d'), days, "none")
+        samples = None
+        if interval_mode != "none":
+            with stage("add_regressors"):
+                future_enriched = add_regressors(create_future_dates(first, days), include_target=False)
+            samples = posterior_samples(bundle, future_enriched, interval_mode)
+        interval_width = bundle.get_model().interval_width if samples is not None else None
+        with stage("aggregate"):
+            result = {
+                granularity: aggregate_periods(forecast['ds'], forecast['yhat'], samples, granularity, interval_width)
+                for granularity in dict.fromkeys(granularities)
+            }
+        forecast_cache.put(bundle, key, result)
+    return first, result
+
+def register_plot(source):
+    """
+    Mémoriser les données d'un graphique et renvoyer son identifiant
+    """
+    forecast_id = uuid.uuid4().hex
+    plot_cache.put(None, ("source", forecast_id), source)
+    return forecast_id
+
+def _render_plot(source, dpi):
+    with stage("plot"):
+        return render_png(source, dpi)
+
+def _chart_data(source, max_points):
+    with stage("downsample"):
+        return chart_data(source, max_points)
+
+async def get_plot_png(forecast_id):
+    """
+    Image PNG d'une prédiction, tracée une seule fois puis servie depuis le cache
+    """
+    png = plot_cache.get(None, ("png", forecast_id))
+    if png is None:
+        source = plot_cache.get(None, ("source", forecast_id))
+        if source is None:
+            raise HTTPException(status_code=404, detail="Prédiction inconnue ou expirée")
+        png = await worker_pool.run(_render_plot, source, config.PLOT_DPI)
+        plot_cache.put(None, ("png", forecast_id), png)
+    return png
 
 @app.get("/")
 async def root():
@@ -46,6 +298,15 @@ async def root():
         "endpoints": {
             "/predict": "POST - Prédire les ventes futures",
             "/predict-csv": "POST - Prédire à partir d'un CSV",
+            "/predict-batch": "POST - Prédire plusieurs fenêtres en un appel",
+            "/predict-aggregate": "POST - Totaux par semaine, mois ou trimestre calendaires",
+            "/plot/{forecast_id}": "GET - Graphique PNG d'une prédiction",
+            "/chart/{forecast_id}": "GET - Séries réduites d'une prédiction, à tracer côté client",
+            "/models": "GET - Modèles par segment disponibles",
+            "/models/reload": "POST - Recharger les modèles sans interruption",
+            "/backtest": "POST - Lancer un backtest à origine glissante (tâche de fond)",
+            "/refit": "POST - Ajouter des jours clos et réajuster le modèle à chaud (tâche de fond)",
+            "/metrics": "GET - Métriques au format Prometheus",
             "/health": "GET - Vérifier l'état de l'API"
         }
     }
@@ -54,174 +315,304 @@ async def root():
 async def health_check():
     return {
         "status": "healthy",
-        "model_loaded": model is not None,
+        "model_loaded": registry.default is not None,
+        "engine": registry.default.engine if registry.default is not None else None,
+        "model_version": registry.default.version if registry.default is not None else None,
+        "cache": forecast_cache.stats(),
+        "plot_cache": plot_cache.stats(),
+        "workers": worker_pool.stats(),
+        "registry": registry.stats(),
+        "jobs": jobs.stats(),
         "timestamp": datetime.now().isoformat()
     }
 
 @app.post("/predict", response_model=ForecastResponse)
-async def predict_sales(request: ForecastRequest):
+async def predict_sales(request: ForecastRequest, plot: bool = False,
+                        layout: ResponseLayout = Query("rows", alias="format"),
+                        chart: bool = False, max_points: int = Query(config.CHART_MAX_POINTS, ge=3),
+                        accept: Optional[str] = Header(None)):
     """
-    Prédire les ventes pour les périodes futures
+    Prédire les ventes pour les périodes futures.
+    chart=true ajoute les séries du graphique, réduites à max_points points.
+    Avec `Accept: application/vnd.apache.arrow.stream`, les prédictions sont
+    renvoyées en flux Arrow IPC (identifiant du graphique dans X-Forecast-Id).
     """
+    arrow = negotiate_format(accept) == "arrow"
+    response, source = await worker_pool.run(_predict_sales, request, layout, max_points if chart else None, arrow)
+    if source is not None and arrow:
+        response.headers["X-Forecast-Id"] = register_plot(source)
+    elif source is not None:
+        response.forecast_id = register_plot(source)
+        if plot:
+            plot_base64 = base64.b64encode(await get_plot_png(response.forecast_id)).decode('utf-8')
+            response.plot_data = {"plot": plot_base64}
+    return response
+
+def _predict_sales(request, layout="rows", max_points=None, arrow=False):
     try:
-        if model is None:
-            raise HTTPException(status_code=500, detail="Modèle non chargé")
-        
-        # Créer les dates futures
-        future_df = create_future_dates(request.start_date, request.periods)
+        bundle = registry.get(request.segment)
         
-        # Ajouter les régresseurs
-        future_enriched = add_regressors(future_df, include_target=False)
-        
-        # Faire la prédiction
-        forecast = model.predict(future_enriched)
-        
-        # Préparer les résultats
-        predictions = []
-        for _, row in forecast.iterrows():
-            predictions.append({
-                "date": row['ds'].strftime('%Y-%m-%d'),
-                "predicted_sales": float(row['yhat']),
-                "predicted_lower": float(row['yhat_lower']) if 'yhat_lower' in row else None,
-                "predicted_upper": float(row['yhat_upper']) if 'yhat_upper' in row else None
-            })
+        # Faire la prédiction (dates futures + régresseurs + modèle, mis en cache)
+        forecast = forecast_window(bundle, request.start_date, request.periods, request.interval_mode)
         
-        # Générer un graphique
-        plt.figure(figsize=(12, 6))
-        plt.plot(forecast['ds'], forecast['yhat'], label='Prédiction', color='blue', linewidth=2)
-        
-        if 'yhat_lower' in forecast.columns and 'yhat_upper' in forecast.columns:
-            plt.fill_between(
-                forecast['ds'], 
-                forecast['yhat_lower'], 
-                forecast['yhat_upper'],
-                alpha=0.2, 
-                color='blue',
-                label='Intervalle de confiance'
-            )
+        # Données du graphique, tracé seulement à la demande
+        source = plot_source(
+            "forecast", forecast,
+            f'Prédiction des ventes pour les {request.periods} prochains jours'
+        )
         
-        plt.title(f'Prédiction des ventes pour les {request.periods} prochains jours', fontsize=14)
-        plt.xlabel('Date', fontsize=12)
-        plt.ylabel('Ventes prédites', fontsize=12)
-        plt.grid(True, alpha=0.3)
-        plt.legend()
-        plt.tight_layout()
+        if arrow:
+            with stage("serialize"):
+                content = frame_to_arrow(forecast, metadata={"model_version": bundle.version})
+            return ArrowStreamResponse(content), source
         
-        # Convertir le graphique en base64
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=100)
-        buf.seek(0)
-        plot_base64 = base64.b64encode(buf.read()).decode('utf-8')
-        plt.close()
+        # Préparer les résultats (sérialisation vectorisée)
+        with stage("serialize"):
+            predictions = serialize_frame(forecast, layout, fill_missing=True)
         
         return ForecastResponse(
             success=True,
             message=f"Prédiction générée pour {request.periods} jours",
-            predictions=predictions,
-            plot_data={"plot": plot_base64}
-        )
+            predictions=predictions if layout == "rows" else None,
+            columns=predictions if layout == "columns" else None,
+            chart=_chart_data(source, max_points) if max_points else None,
+            model_version=bundle.version
+        ), source
         
     except Exception as e:
         return ForecastResponse(
             success=False,
             message="Erreur lors de la prédiction",
             error=str(e)
-        )
+        ), None
 
 @app.post("/predict-csv")
-async def predict_from_csv(file: UploadFile = File(...)):
+async def predict_from_csv(file: UploadFile = File(...), interval_mode: IntervalMode = "none", plot: bool = False,
+                           layout: ResponseLayout = Query("rows", alias="format"), limit: int = 10,
+                           segment: Optional[str] = None, chart: bool = False,
+                           max_points: int = Query(config.CHART_MAX_POINTS, ge=3),
+                           accept: Optional[str] = Header(None)):
     """
-    Prédire à partir d'un fichier CSV
+    Prédire à partir d'un fichier CSV, Parquet ou Arrow IPC.
+    Seules les `limit` dernières prédictions sont renvoyées (toutes si limit=0).
+    chart=true ajoute les séries du graphique, réduites à max_points points.
+    Avec `Accept: application/vnd.apache.arrow.stream`, les prédictions sont
+    renvoyées en flux Arrow IPC (métriques dans les métadonnées du schéma).
     """
+    arrow = negotiate_format(accept) == "arrow"
+    # Lire le fichier par morceaux et l'agréger en série journalière
     try:
-        if model is None:
-            raise HTTPException(status_code=500, detail="Modèle non chargé")
-        
-        # Lire le fichier CSV
-        contents = await file.read()
-        df = pd.read_csv(io.StringIO(contents.decode('utf-8')))
-        
-        # Renommer les colonnes si nécessaire
-        column_mapping = {
-            "Date Order was placed": "ds",
-            "Total Retail Price for This Order": "y",
-            "date": "ds",
-            "sales": "y"
-        }
-        
-        for old_col, new_col in column_mapping.items():
-            if old_col in df.columns:
-                df.rename(columns={old_col: new_col}, inplace=True)
-        
-        if 'ds' not in df.columns:
-            raise ValueError("Colonne de date introuvable. Noms acceptés: 'Date Order was placed', 'date'")
-        
-        if 'y' not in df.columns:
-            raise ValueError("Colonne de ventes introuvable. Noms acceptés: 'Total Retail Price for This Order', 'sales'")
-        
-        # Convertir les dates
-        df['ds'] = pd.to_datetime(df['ds'])
+        if file.size is not None and file.size > config.MAX_UPLOAD_BYTES:
+            raise UploadTooLarge(f"Fichier trop volumineux (limite: {config.MAX_UPLOAD_BYTES} octets)")
+        df = await worker_pool.run_in_thread(_read_upload, file.file, file.content_type)
+    except ValueError as e:
+        return JSONResponse(
+            status_code=413 if isinstance(e, UploadTooLarge) else 400,
+            content={
+                "success": False,
+                "error": str(e)
+            }
+        )
+    
+    result, source = await worker_pool.run(
+        _predict_from_csv, df, interval_mode, layout, limit, segment, max_points if chart else None, arrow
+    )
+    if source is None:
+        return result
+    if arrow:
+        result.headers["X-Forecast-Id"] = register_plot(source)
+        return result
+    result["forecast_id"] = register_plot(source)
+    if plot:
+        result["plot"] = base64.b64encode(await get_plot_png(result["forecast_id"])).decode('utf-8')
+    return FastJSONResponse(result)
+
+def _read_upload(fileobj, content_type=None):
+    with stage("read_csv"):
+        return read_daily_series(
+            fileobj, config.MAX_UPLOAD_BYTES, config.MAX_UPLOAD_DECOMPRESSED_BYTES, config.CSV_CHUNK_ROWS,
+            content_type
+        )
+
+def _predict_from_csv(df, interval_mode="none", layout="rows", limit=10, segment=None, max_points=None,
+                      arrow=False):
+    try:
+        bundle = registry.get(segment)
         
         # Ajouter les régresseurs
-        df_enriched = add_regressors(df, include_target=True)
+        with stage("add_regressors"):
+            df_enriched = add_regressors(df, include_target=True)
         
         # Prédire
-        forecast = model.predict(df_enriched)
+        forecast = predict_with_mode(bundle, df_enriched, interval_mode)
         
         # Calculer les métriques si on a les vraies valeurs
         metrics = None
         if 'y' in df_enriched.columns and not df_enriched['y'].isna().all():
-            metrics = calculate_metrics(
-                df_enriched['y'].values, 
-                forecast['yhat'].values[:len(df_enriched)]
-            )
+            with stage("metrics"):
+                metrics = calculate_metrics(
+                    df_enriched['y'].values, 
+                    forecast['yhat'].values[:len(df_enriched)]
+                )
+        
+        source = plot_source(
+            "comparison", forecast,
+            'Comparaison des ventes réelles et prédites',
+            actual=df_enriched if 'y' in df_enriched.columns else None
+        )
         
-        # Préparer les résultats
-        results = []
-        for i, (_, row) in enumerate(forecast.iterrows()):
-            result_item = {
-                "date": row['ds'].strftime('%Y-%m-%d'),
-                "predicted_sales": float(row['yhat']),
-            }
-            
-            if i < len(df):
-                result_item["actual_sales"] = float(df_enriched.iloc[i]['y']) if 'y' in df_enriched.columns else None
-            
-            results.append(result_item)
+        output = forecast.tail(limit) if limit > 0 else forecast
+        if arrow:
+            with stage("serialize"):
+                if 'y' in df_enriched.columns:
+                    actual = df_enriched['y'].to_numpy()[:len(forecast)]
+                    output = output.assign(y=actual[len(forecast) - len(output):])
+                content = frame_to_arrow(output, {**FORECAST_FIELDS, "actual_sales": "y"}, metadata={
+                    "model_version": bundle.version,
+                    "metrics": metrics,
+                    "total_predictions": len(forecast)
+                })
+            return ArrowStreamResponse(content), source
+        
+        # Préparer les résultats (sérialisation vectorisée des dernières lignes)
+        with stage("serialize"):
+            columns = serialize_frame(output, "columns")
+            if 'y' in df_enriched.columns:
+                actual = df_enriched['y'].to_numpy()[:len(forecast)]
+                columns["actual_sales"] = numbers_to_list(actual[len(forecast) - len(output):])
+            predictions = columns if layout == "columns" else columns_to_rows(columns)
         
-        # Générer un graphique comparatif
-        plt.figure(figsize=(14, 7))
+        return {
+            "success": True,
+            "message": "Prédiction effectuée avec succès",
+            "predictions": predictions,
+            "plot": None,
+            "chart": _chart_data(source, max_points) if max_points else None,
+            "metrics": metrics,
+            "total_predictions": len(forecast),
+            "model_version": bundle.version
+        }, source
         
-        # Tracer les prédictions
-        plt.plot(forecast['ds'], forecast['yhat'], label='Prédictions', color='blue', linewidth=2)
+    except Exception as e:
+        return JSONResponse(
+            status_code=400,
+            content={
+                "success": False,
+                "error": str(e)
+            }
+        ), None
+
+@app.post("/predict-aggregate")
+async def predict_aggregate(request: AggregateForecastRequest, layout: ResponseLayout = Query("rows", alias="format")):
+    """
+    Totaux prédits par semaine, mois ou trimestre calendaires complets, avec
+    des intervalles calculés sur les trajectoires simulées
+    """
+    return await worker_pool.run(_predict_aggregate, request, layout)
+
+AGGREGATE_FIELDS = {
+    "period": "period",
+    "start_date": "start",
+    "end_date": "end",
+    "predicted_sales": "yhat",
+    "predicted_lower": "yhat_lower",
+    "predicted_upper": "yhat_upper"
+}
+
+def _predict_aggregate(request, layout="rows"):
+    try:
+        bundle = registry.get(request.segment)
         
-        # Tracer les valeurs réelles si disponibles
-        if 'y' in df_enriched.columns and not df_enriched['y'].isna().all():
-            plt.scatter(df_enriched['ds'], df_enriched['y'], 
-                       label='Ventes réelles', color='green', alpha=0.6, s=30)
+        if not request.granularities:
+            raise ValueError("Aucune granularité demandée")
         
-        plt.title('Comparaison des ventes réelles et prédites', fontsize=14)
-        plt.xlabel('Date', fontsize=12)
-        plt.ylabel('Ventes', fontsize=12)
-        plt.grid(True, alpha=0.3)
-        plt.legend()
-        plt.tight_layout()
+        start_date, aggregates = aggregate_window(
+            bundle, request.start_date or datetime.now().strftime('%Y-%m-%d'),
+            request.periods, request.granularities, request.interval_mode
+        )
         
-        # Convertir en base64
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=100)
-        buf.seek(0)
-        plot_base64 = base64.b64encode(buf.read()).decode('utf-8')
-        plt.close()
+        with stage("serialize"):
+            results = {
+                granularity: serialize_frame(frame, layout, fields=AGGREGATE_FIELDS)
+                for granularity, frame in aggregates.items()
+            }
         
-        return {
+        return FastJSONResponse({
             "success": True,
-            "message": "Prédiction effectuée avec succès",
-            "predictions": results[-10:],  # Dernières 10 prédictions
-            "plot": plot_base64,
-            "metrics": metrics,
-            "total_predictions": len(results)
-        }
+            "message": f"Prédiction agrégée sur {request.periods} période(s)",
+            "start_date": start_date.strftime('%Y-%m-%d'),
+            "aggregates": results,
+            "model_version": bundle.version
+        })
+        
+    except Exception as e:
+        return JSONResponse(
+            status_code=400,
+            content={
+                "success": False,
+                "error": str(e)
+            }
+        )
+
+@app.post("/predict-batch")
+async def predict_batch(request: BatchForecastRequest, layout: ResponseLayout = Query("columns", alias="format")):
+    """
+    Prédire plusieurs fenêtres en un seul appel : l'union des dates n'est
+    prédite qu'une fois, puis redistribuée par fenêtre
+    """
+    return await worker_pool.run(_predict_batch, request, layout)
+
+def _predict_batch(request, layout="columns"):
+    try:
+        bundle = registry.get(request.segment)
+        
+        if not request.windows:
+            raise ValueError("Aucune fenêtre demandée")
+        if len(request.windows) > config.BATCH_MAX_WINDOWS:
+            raise ValueError(f"Trop de fenêtres (limite: {config.BATCH_MAX_WINDOWS})")
+        periods = np.array([w.periods for w in request.windows])
+        if (periods <= 0).any():
+            raise ValueError("periods doit être strictement positif")
+        if periods.max() > config.BATCH_MAX_WINDOW_DAYS:
+            raise ValueError(f"Fenêtre trop longue: {periods.max()} jours (limite: {config.BATCH_MAX_WINDOW_DAYS})")
+        if periods.sum() > config.BATCH_MAX_TOTAL_DAYS:
+            raise ValueError(f"Trop de jours demandés: {periods.sum()} (limite: {config.BATCH_MAX_TOTAL_DAYS})")
+        
+        # Union des dates de toutes les fenêtres
+        starts = np.array([pd.Timestamp(w.start_date).normalize().to_datetime64() for w in request.windows],
+                          dtype='datetime64[D]')
+        day = np.timedelta64(1, 'D')
+        dates = np.unique(np.concatenate([
+            np.arange(start, start + n * day, day) for start, n in zip(starts, periods)
+        ]))
+        
+        # Une seule prédiction pour l'union (table précalculée si elle couvre tout)
+        with_intervals = request.interval_mode != "none"
+        with stage("table_lookup"):
+            forecast = bundle.forecast_table.take(dates, with_intervals) if bundle.forecast_table is not None else None
+        if forecast is None:
+            with stage("add_regressors"):
+                future_enriched = add_regressors(pd.DataFrame({'ds': dates.astype('datetime64[ns]')}), include_target=False)
+            forecast = predict_with_mode(bundle, future_enriched, request.interval_mode)
+        
+        # Position de chaque fenêtre dans l'union (dates contiguës et triées)
+        offsets = np.searchsorted(dates, starts)
+        with stage("serialize"):
+            columns = serialize_frame(forecast, "columns")
+        windows = [
+            {"start_date": str(start), "periods": int(n), "offset": int(offset)}
+            for start, n, offset in zip(starts, periods, offsets)
+        ]
+        
+        if layout == "rows":
+            for window in windows:
+                window_slice = slice(window["offset"], window["offset"] + window["periods"])
+                window["predictions"] = columns_to_rows({name: values[window_slice] for name, values in columns.items()})
+            result = {"success": True, "total_dates": len(dates), "windows": windows}
+        else:
+            result = {"success": True, "total_dates": len(dates), "columns": columns, "windows": windows}
+        result["model_version"] = bundle.version
+        return FastJSONResponse(result)
         
     except Exception as e:
         return JSONResponse(
@@ -232,52 +623,251 @@ async def predict_from_csv(file: UploadFile = File(...)):
             }
         )
 
+@app.get("/models")
+async def list_models():
+    """
+    Modèles par segment : segments disponibles et métriques du registre
+    """
+    return {
+        "default_loaded": registry.default is not None,
+        "available_segments": await worker_pool.run_in_thread(registry.available_segments),
+        "registry": registry.stats()
+    }
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """
+    Métriques au format texte de Prometheus
+    """
+    for name, cache_stats in (("forecast", forecast_cache.stats()), ("plot", plot_cache.stats())):
+        CACHE_HIT_RATIO.set(cache_stats["hit_ratio"], cache=name)
+        CACHE_ENTRIES.set(cache_stats["entries"], cache=name)
+        CACHE_BYTES.set(cache_stats["bytes"], cache=name)
+    registry_stats = registry.stats()
+    CACHE_HIT_RATIO.set(registry_stats["hit_ratio"], cache="models")
+    CACHE_ENTRIES.set(len(registry_stats["loaded"]), cache="models")
+    CACHE_BYTES.set(registry_stats["bytes"], cache="models")
+    worker_stats = worker_pool.stats()
+    WORKERS.set(worker_stats["in_flight"], state="in_flight")
+    WORKERS.set(worker_stats["waiting"], state="waiting")
+    return Response(content=metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def admin_denied(x_admin_token):
+    """
+    Réponse 403 si ADMIN_TOKEN est défini et que le jeton reçu ne correspond pas
+    """
+    if config.ADMIN_TOKEN and x_admin_token != config.ADMIN_TOKEN:
+        return JSONResponse(
+            status_code=403,
+            content={
+                "success": False,
+                "error": "Jeton d'administration invalide"
+            }
+        )
+    return None
+
+@app.post("/models/reload")
+async def reload_models_endpoint(x_admin_token: Optional[str] = Header(None)):
+    """
+    Recharger le modèle global et les modèles par segment dont le fichier a
+    changé : chargement et prédiction de test en arrière-plan, puis bascule
+    """
+    denied = admin_denied(x_admin_token)
+    if denied is not None:
+        return denied
+    try:
+        changed = await reload_models()
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "error": f"Rechargement impossible, version précédente conservée: {e}"
+            }
+        )
+    return {
+        "success": True,
+        "reloaded": changed,
+        "model_version": registry.default.version if registry.default is not None else None
+    }
+
+def _run_backtest(request):
+    from backtest import run_backtest
+    
+    bundle = registry.get(request.segment)
+    history = bundle.get_model().history
+    if len(history) < request.initial_days + request.horizon_days:
+        raise ValueError(
+            f"Historique du modèle insuffisant ({len(history)} jours pour {request.initial_days} + "
+            f"{request.horizon_days}) ; un artefact allégé ne garde pas son historique"
+        )
+    report = run_backtest(
+        history[['ds', 'y']], bundle.path, request.initial_days, request.period_days, request.horizon_days,
+        workers=config.BACKTEST_WORKERS, warm_start=request.warm_start
+    )
+    report["segment"] = request.segment
+    report["model_version"] = bundle.version
+    return report
+
+@app.post("/backtest", status_code=202)
+async def start_backtest(request: BacktestRequest, x_admin_token: Optional[str] = Header(None)):
+    """
+    Lancer un backtest à origine glissante en tâche de fond ; suivre son
+    avancement et lire son rapport avec GET /backtest/{job_id}
+    """
+    denied = admin_denied(x_admin_token)
+    if denied is not None:
+        return denied
+    job = jobs.submit("backtest", _run_backtest, request)
+    return {"success": True, "job_id": job["id"], "status": job["status"]}
+
+@app.get("/backtest")
+async def list_backtests():
+    return {"jobs": jobs.list("backtest")}
+
+@app.get("/backtest/{job_id}")
+async def get_backtest(job_id: str):
+    """
+    État d'un backtest et, une fois terminé, son rapport (métriques par horizon)
+    """
+    job = jobs.get(job_id)
+    if job is None or job["kind"] != "backtest":
+        raise HTTPException(status_code=404, detail="Tâche inconnue ou expirée")
+    return job
+
+def _run_refit(request):
+    from refit import refit_model, publish_default, publish_segment
+    from artifact import is_artifact
+
+    bundle = registry.get(request.segment)
+    if is_artifact(bundle.path):
+        raise ValueError("Un artefact allégé ne garde pas son historique complet ; réentraîner avec train.py")
+    observations = pd.DataFrame({
+        'ds': pd.to_datetime([observation.date for observation in request.observations]),
+        'y': [observation.sales for observation in request.observations]
+    })
+    model, report = refit_model(bundle.get_model(), observations, compare_cold=request.compare_cold)
+    for start, seconds in report["fit_seconds"].items():
+        REFIT_SECONDS.observe(seconds, start=start)
+
+    # Publication comme nouvelle version (les précédentes sont conservées), puis rechargement
+    if request.segment is None:
+        relative_path = publish_default(model, config.MODEL_DIR, registry.default_source, report)
+    else:
+        relative_path = publish_segment(model, config.MODEL_DIR, request.segment, report)
+    path = os.path.join(config.MODEL_DIR, relative_path)
+    changed = registry.reload()
+    if changed:
+        print(f"Modèles rechargés: {changed}")
+        worker_pool.recycle()
+
+    report["segment"] = request.segment
+    report["model_version"] = {"from": bundle.version, "to": model_version(path)}
+    return report
+
+@app.post("/refit", status_code=202)
+async def start_refit(request: RefitRequest, x_admin_token: Optional[str] = Header(None)):
+    """
+    Ajouter les ventes de jours clos à l'historique du modèle et le
+    réajuster à chaud en tâche de fond ; la nouvelle version est publiée
+    et rechargée à la fin de la tâche (GET /refit/{job_id}). Refusé tant
+    qu'ADMIN_TOKEN n'est pas configuré : l'endpoint change le modèle servi.
+    """
+    if not config.ADMIN_TOKEN:
+        return JSONResponse(
+            status_code=403,
+            content={
+                "success": False,
+                "error": "Réajustement désactivé : définir ADMIN_TOKEN pour l'autoriser"
+            }
+        )
+    denied = admin_denied(x_admin_token)
+    if denied is not None:
+        return denied
+    if not request.observations:
+        raise HTTPException(status_code=400, detail="Aucune observation")
+    job = jobs.submit("refit", _run_refit, request)
+    return {"success": True, "job_id": job["id"], "status": job["status"]}
+
+@app.get("/refit")
+async def list_refits():
+    return {"jobs": jobs.list("refit")}
+
+@app.get("/refit/{job_id}")
+async def get_refit(job_id: str):
+    """
+    État d'un réajustement et, une fois terminé, la nouvelle version et les
+    durées d'ajustement
+    """
+    job = jobs.get(job_id)
+    if job is None or job["kind"] != "refit":
+        raise HTTPException(status_code=404, detail="Tâche inconnue ou expirée")
+    return job
+
+@app.get("/plot/{forecast_id}")
+async def get_plot(forecast_id: str):
+    """
+    Graphique PNG d'une prédiction précédente
+    """
+    return Response(content=await get_plot_png(forecast_id), media_type="image/png")
+
+@app.get("/chart/{forecast_id}")
+async def get_chart(forecast_id: str, max_points: int = Query(config.CHART_MAX_POINTS, ge=3)):
+    """
+    Séries du graphique d'une prédiction précédente, réduites à max_points points
+    """
+    source = plot_cache.get(None, ("source", forecast_id))
+    if source is None:
+        raise HTTPException(status_code=404, detail="Prédiction inconnue ou expirée")
+    return FastJSONResponse(await worker_pool.run_in_thread(_chart_data, source, max_points))
+
 @app.post("/predict-next-months")
-async def predict_next_three_months():
+async def predict_next_three_months(interval_mode: IntervalMode = "full",
+                                    layout: ResponseLayout = Query("rows", alias="format"),
+                                    segment: Optional[str] = None):
     """
     Prédire automatiquement les 3 prochains mois à partir d'aujourd'hui
     """
+    return await worker_pool.run(_predict_next_three_months, interval_mode, layout, segment)
+
+def _predict_next_three_months(interval_mode="full", layout="rows", segment=None):
     try:
-        if model is None:
-            raise HTTPException(status_code=500, detail="Modèle non chargé")
+        bundle = registry.get(segment)
         
-        # Date d'aujourd'hui
-        start_date = datetime.now().strftime('%Y-%m-%d')
-        
-        # 3 mois = environ 90 jours
-        future_df = create_future_dates(start_date, 90)
-        future_enriched = add_regressors(future_df, include_target=False)
-        
-        # Prédiction
-        forecast = model.predict(future_enriched)
-        
-        # Agréger par mois
-        forecast['month'] = forecast['ds'].dt.to_period('M')
-        monthly_forecast = forecast.groupby('month').agg({
-            'yhat': 'sum',
-            'yhat_lower': 'sum',
-            'yhat_upper': 'sum'
-        }).reset_index()
-        
-        monthly_forecast['month'] = monthly_forecast['month'].dt.strftime('%Y-%m')
+        # Les 3 mois calendaires complets à partir du mois en cours, intervalles
+        # tirés des trajectoires simulées (et non de la somme des bornes journalières)
+        start_date, aggregates = aggregate_window(
+            bundle, datetime.now().strftime('%Y-%m-%d'), 3, ["month"], interval_mode
+        )
+        monthly_forecast = aggregates["month"]
+        has_intervals = 'yhat_lower' in monthly_forecast.columns
         
         # Préparer la réponse
-        predictions = []
-        for _, row in monthly_forecast.iterrows():
-            predictions.append({
-                "month": row['month'],
-                "predicted_sales": float(row['yhat']),
-                "predicted_range": {
-                    "lower": float(row['yhat_lower']),
-                    "upper": float(row['yhat_upper'])
-                }
-            })
+        columns = serialize_frame(monthly_forecast, "columns", fields={
+            "month": "period",
+            "predicted_sales": "yhat",
+            "predicted_lower": "yhat_lower",
+            "predicted_upper": "yhat_upper"
+        })
+        if layout == "columns":
+            predictions = columns
+        else:
+            ranges = (
+                [{"lower": lower, "upper": upper}
+                 for lower, upper in zip(columns["predicted_lower"], columns["predicted_upper"])]
+                if has_intervals else [None] * len(monthly_forecast)
+            )
+            predictions = [
+                {"month": month, "predicted_sales": sales, "predicted_range": predicted_range}
+                for month, sales, predicted_range in zip(columns["month"], columns["predicted_sales"], ranges)
+            ]
         
         return {
             "success": True,
             "message": "Prédiction des 3 prochains mois",
-            "start_date": start_date,
-            "monthly_predictions": predictions
+            "start_date": start_date.strftime('%Y-%m-%d'),
+            "monthly_predictions": predictions,
+            "model_version": bundle.version
         }
         
     except Exception as e:
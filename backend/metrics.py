@@ -0,0 +1,233 @@
+"""
+Métriques de l'API au format texte de Prometheus (/metrics) et détail par
+étape des requêtes (en-tête Server-Timing).
+
+Les durées des étapes sont collectées dans une variable de contexte propre
+à chaque requête : le pool de threads copie ce contexte, et les processus
+du pool renvoient leurs durées avec le résultat (run_with_timings).
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = tuple(1024 * 4 ** i for i in range(11))  # 1 Ko -> 1 Go
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f"Labels attendus pour {self.name}: {self.labels}")
+        return tuple(labels[name] for name in self.labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_samples(items))
+        return lines
+
+    def _render_samples(self, items):
+        return [
+            f"{self.name}{_format_labels(self.labels, key)} {_format_number(value)}"
+            for key, value in items
+        ]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0, 0.0]
+            counts = state[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            state[1] += 1
+            state[2] += value
+
+    def _render_samples(self, items):
+        lines = []
+        for key, (counts, count, total) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, [('le', _format_number(bound))])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_number(total)}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, documentation, labels=()):
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(self, name, documentation, labels=()):
+        return self._register(Gauge(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+REQUESTS = registry.counter(
+    "forecast_api_requests_total", "Requêtes HTTP par endpoint, méthode et statut",
+    ("endpoint", "method", "status")
+)
+REQUEST_SECONDS = registry.histogram(
+    "forecast_api_request_seconds", "Durée totale des requêtes HTTP", ("endpoint",)
+)
+IN_FLIGHT = registry.gauge(
+    "forecast_api_requests_in_flight", "Requêtes HTTP en cours", ("endpoint",)
+)
+REQUEST_BYTES = registry.histogram(
+    "forecast_api_request_bytes", "Taille des corps de requête (Content-Length)", ("endpoint",), SIZE_BUCKETS
+)
+RESPONSE_BYTES = registry.histogram(
+    "forecast_api_response_bytes", "Taille des réponses", ("endpoint",), SIZE_BUCKETS
+)
+STAGE_SECONDS = registry.histogram(
+    "forecast_api_stage_seconds", "Durée de chaque étape du traitement d'une requête", ("stage",)
+)
+REFIT_SECONDS = registry.histogram(
+    "forecast_api_refit_seconds", "Durée des réajustements incrémentaux, à chaud ou à froid", ("start",),
+    (1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+)
+WORKERS = registry.gauge(
+    "forecast_api_workers", "Traitements en cours et en attente dans le pool", ("state",)
+)
+CACHE_HIT_RATIO = registry.gauge(
+    "forecast_api_cache_hit_ratio", "Taux de succès des caches", ("cache",)
+)
+CACHE_ENTRIES = registry.gauge(
+    "forecast_api_cache_entries", "Entrées en cache", ("cache",)
+)
+CACHE_BYTES = registry.gauge(
+    "forecast_api_cache_bytes", "Mémoire occupée par les caches", ("cache",)
+)
+
+# Durées des étapes de la requête en cours : [(étape, secondes)]
+_stage_timings = contextvars.ContextVar("stage_timings", default=None)
+
+
+def start_request():
+    """
+    Commencer la collecte des étapes d'une requête ; renvoie la liste des durées
+    """
+    timings = []
+    _stage_timings.set(timings)
+    return timings
+
+
+def record_stage(name, seconds):
+    STAGE_SECONDS.observe(seconds, stage=name)
+    timings = _stage_timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+
+@contextmanager
+def stage(name):
+    """
+    Mesurer une étape : `with stage("predict"): ...`
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+
+def run_with_timings(func, *args, **kwargs):
+    """
+    Exécuter func dans un processus du pool et renvoyer (résultat, durées des étapes)
+    """
+    timings = start_request()
+    return func(*args, **kwargs), timings
+
+
+def server_timing(timings, total=None):
+    """
+    Valeur de l'en-tête Server-Timing : étapes cumulées par nom, en ms
+    """
+    durations = {}
+    for name, seconds in timings:
+        durations[name] = durations.get(name, 0.0) + seconds
+    if total is not None:
+        durations["total"] = total
+    return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in durations.items())
@@ -1,23 +1,78 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
 # Un garde-fou automatique pour tes entrées et sorties
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Dict, Literal
 import pandas as pd
 
+# Calcul des intervalles de confiance : aucun, échantillonnage réduit ou complet
+IntervalMode = Literal["none", "fast", "full"]
+
+# Forme des prédictions dans la réponse : liste de lignes ou colonnes
+ResponseLayout = Literal["rows", "columns"]
+
+# Périodes calendaires des prédictions agrégées
+Granularity = Literal["week", "month", "quarter"]
+
 class ForecastRequest(BaseModel):
     """Modèle pour les requêtes de prédiction"""
     start_date: str
     periods: int = 90  # 3 mois par défaut
     include_history: bool = False
+    interval_mode: IntervalMode = "full"
+    segment: Optional[str] = None  # ex. "product_line:Children", modèle global si absent
     
+class ForecastWindow(BaseModel):
+    """Fenêtre de prédiction d'une requête groupée"""
+    start_date: str
+    periods: int = 90
+
+class BatchForecastRequest(BaseModel):
+    """Modèle pour les prédictions groupées sur plusieurs fenêtres"""
+    windows: List[ForecastWindow]
+    interval_mode: IntervalMode = "full"
+    segment: Optional[str] = None
+
+class AggregateForecastRequest(BaseModel):
+    """Modèle pour les prédictions agrégées par période calendaire"""
+    start_date: Optional[str] = None  # défaut : aujourd'hui
+    periods: int = 3  # nombre de périodes complètes de la première granularité
+    granularities: List[Granularity] = ["month"]
+    interval_mode: IntervalMode = "full"
+    segment: Optional[str] = None
+
+class BacktestRequest(BaseModel):
+    """Modèle pour les backtests à origine glissante"""
+    segment: Optional[str] = None
+    initial_days: int = Field(730, gt=0)  # historique minimal de la première coupure
+    period_days: int = Field(90, gt=0)  # écart entre deux coupures
+    horizon_days: int = Field(90, gt=0)
+    warm_start: bool = True
+
+class Observation(BaseModel):
+    """Ventes d'un jour clos"""
+    date: str
+    sales: float
+
+class RefitRequest(BaseModel):
+    """Modèle pour les réentraînements incrémentaux"""
+    observations: List[Observation]
+    segment: Optional[str] = None
+    compare_cold: bool = False  # chronométrer aussi un ajustement à froid
+
 class CSVForecastRequest(BaseModel):
     """Modèle pour les prédictions à partir de CSV"""
     file_content: str  # Contenu du fichier en base64
 
 class ForecastResponse(BaseModel):
     """Modèle pour les réponses"""
+    model_config = ConfigDict(protected_namespaces=())
+    
     success: bool
     message: str
     predictions: Optional[List[dict]] = None
+    columns: Optional[Dict[str, list]] = None
     plot_data: Optional[dict] = None
+    chart: Optional[dict] = None  # séries du graphique réduites, si chart=true
+    forecast_id: Optional[str] = None
+    model_version: Optional[str] = None  # version du modèle ayant produit la prédiction
     error: Optional[str] = None
\ No newline at end of file
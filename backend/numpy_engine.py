@@ -0,0 +1,234 @@
+import numpy as np
+import pandas as pd
+
+from utils import add_regressors
+
+NANOSECONDS_TO_SECONDS = 1000 * 1000 * 1000
+NANOSECONDS_PER_DAY = 24 * 3600 * NANOSECONDS_TO_SECONDS
+
+
+def _to_datetime64(dates):
+    return pd.to_datetime(pd.Series(dates)).to_numpy(dtype='datetime64[ns]')
+
+
+class NumpyProphet:
+    """
+    Évaluateur NumPy des prédictions ponctuelles (yhat) d'un modèle Prophet
+    déjà entraîné.
+
+    Les paramètres (tendance et points de rupture, coefficients de Fourier
+    des saisonnalités, jours spéciaux, coefficients des régresseurs) sont
+    extraits une seule fois ; chaque prédiction n'est ensuite qu'un calcul
+    vectorisé, sans DataFrame intermédiaire. Les intervalles de confiance
+    restent calculés par Prophet.
+    """
+
+    def __init__(self, start, t_scale, y_scale, floor, k, m, deltas, changepoints_t,
+                 seasonalities, holiday_first_day, holiday_matrix, regressors,
+                 beta_additive, beta_multiplicative, columns):
+        self.start = start  # ns depuis l'epoch
+        self.t_scale = t_scale  # ns
+        self.y_scale = y_scale
+        self.floor = floor
+        self.k = k
+        self.m = m
+        self.deltas = deltas
+        self.changepoints_t = changepoints_t
+        self.seasonalities = seasonalities  # [(nom, période, ordre)]
+        self.holiday_first_day = holiday_first_day  # jours depuis l'epoch
+        self.holiday_matrix = holiday_matrix  # (jours, colonnes de jours spéciaux)
+        self.regressors = regressors  # [(nom, mu, std)]
+        self.beta_additive = beta_additive
+        self.beta_multiplicative = beta_multiplicative
+        self.columns = columns
+
+    @classmethod
+    def from_model(cls, model, holiday_years=None):
+        """
+        Extraire les paramètres d'un modèle Prophet entraîné
+        """
+        if model.growth not in ('linear', 'flat'):
+            raise ValueError(f"Croissance '{model.growth}' non prise en charge par le moteur NumPy")
+        if model.logistic_floor:
+            raise ValueError("Le plancher logistique n'est pas pris en charge par le moteur NumPy")
+        for name, props in model.seasonalities.items():
+            if props['condition_name'] is not None:
+                raise ValueError(f"Saisonnalité conditionnelle '{name}' non prise en charge")
+
+        # Ordre exact des colonnes de la matrice de régression, sur une ligne sonde
+        probe = pd.DataFrame({'ds': [model.start]})
+        for name in model.extra_regressors:
+            probe[name] = 0.0
+        probe = model.setup_dataframe(probe)
+        features, _, component_cols, _ = model.make_all_seasonality_features(probe)
+        columns = list(features.columns)
+
+        seasonalities = [
+            (name, float(props['period']), int(props['fourier_order']))
+            for name, props in model.seasonalities.items()
+        ]
+        regressors = [
+            (name, float(props['mu']), float(props['std']))
+            for name, props in model.extra_regressors.items()
+        ]
+        n_fourier = sum(2 * order for _, _, order in seasonalities)
+        holiday_columns = columns[n_fourier:len(columns) - len(regressors)]
+        holiday_first_day, holiday_matrix = cls._holiday_table(model, holiday_columns, holiday_years)
+
+        beta = np.nanmean(model.params['beta'], axis=0)
+        beta_additive = beta * component_cols['additive_terms'].to_numpy() * model.y_scale
+        beta_multiplicative = beta * component_cols['multiplicative_terms'].to_numpy()
+
+        if model.scaling == 'minmax':
+            floor = float(model.y_min)
+        else:
+            floor = 0.0
+
+        return cls(
+            start=pd.Timestamp(model.start).value,
+            t_scale=pd.Timedelta(model.t_scale).value,
+            y_scale=float(model.y_scale),
+            floor=floor,
+            k=float(np.nanmean(model.params['k'])),
+            m=float(np.nanmean(model.params['m'])),
+            deltas=np.nanmean(model.params['delta'], axis=0),
+            changepoints_t=np.asarray(model.changepoints_t, dtype=np.float64),
+            seasonalities=seasonalities,
+            holiday_first_day=holiday_first_day,
+            holiday_matrix=holiday_matrix,
+            regressors=regressors,
+            beta_additive=beta_additive,
+            beta_multiplicative=beta_multiplicative,
+            columns=columns
+        )
+
+    @staticmethod
+    def _holiday_table(model, holiday_columns, holiday_years=None):
+        """
+        Table dense jour -> indicateurs des jours spéciaux (fenêtres incluses)
+        """
+        if not holiday_columns:
+            return 0, np.zeros((0, 0), dtype=np.uint8)
+
+        if model.country_holidays is not None:
+            if holiday_years is None:
+                first_year = model.history['ds'].min().year - 10
+                holiday_years = (first_year, first_year + 100)
+            years = pd.Series(pd.to_datetime([f"{y}-01-01" for y in range(*holiday_years)]))
+            holidays = model.construct_holiday_dataframe(years)
+        else:
+            holidays = model.construct_holiday_dataframe(pd.Series(pd.to_datetime([model.start])))
+
+        column_index = {name: j for j, name in enumerate(holiday_columns)}
+        days, cols = [], []
+        for row in holidays.itertuples():
+            if pd.isnull(row.ds):
+                continue
+            day = pd.Timestamp(row.ds.date()).value // NANOSECONDS_PER_DAY
+            try:
+                lw = int(getattr(row, 'lower_window', 0))
+                uw = int(getattr(row, 'upper_window', 0))
+            except ValueError:
+                lw = 0
+                uw = 0
+            for offset in range(lw, uw + 1):
+                key = '{}_delim_{}{}'.format(row.holiday, '+' if offset >= 0 else '-', abs(offset))
+                if key in column_index:
+                    days.append(day + offset)
+                    cols.append(column_index[key])
+
+        if not days:
+            return 0, np.zeros((0, len(holiday_columns)), dtype=np.uint8)
+        days = np.asarray(days, dtype=np.int64)
+        first_day = int(days.min())
+        matrix = np.zeros((int(days.max()) - first_day + 1, len(holiday_columns)), dtype=np.uint8)
+        matrix[days - first_day, cols] = 1
+        return first_day, matrix
+
+    def trend(self, t):
+        """
+        Tendance linéaire par morceaux (même formule que Prophet)
+        """
+        deltas_t = (self.changepoints_t[None, :] <= t[..., None]) * self.deltas
+        k_t = deltas_t.sum(axis=1) + self.k
+        m_t = (deltas_t * -self.changepoints_t).sum(axis=1) + self.m
+        return k_t * t + m_t
+
+    def feature_matrix(self, ds, regressors):
+        """
+        Matrice de régression (saisonnalités, jours spéciaux, régresseurs)
+        """
+        n = ds.shape[0]
+        blocks = []
+
+        # Saisonnalités de Fourier, en jours depuis l'epoch comme Prophet
+        t_days = ds.view(np.int64) // NANOSECONDS_TO_SECONDS / (3600 * 24.)
+        x_T = t_days * np.pi * 2
+        for _, period, order in self.seasonalities:
+            fourier = np.empty((n, 2 * order))
+            for i in range(order):
+                c = x_T * (i + 1) / period
+                fourier[:, 2 * i] = np.sin(c)
+                fourier[:, 2 * i + 1] = np.cos(c)
+            blocks.append(fourier)
+
+        # Jours spéciaux, lus dans la table précalculée
+        if self.holiday_matrix.shape[1]:
+            offsets = ds.astype('datetime64[D]').view(np.int64) - self.holiday_first_day
+            inside = (offsets >= 0) & (offsets < self.holiday_matrix.shape[0])
+            holidays = np.zeros((n, self.holiday_matrix.shape[1]))
+            holidays[inside] = self.holiday_matrix[offsets[inside]]
+            blocks.append(holidays)
+
+        # Régresseurs additionnels standardisés
+        if self.regressors:
+            values = np.empty((n, len(self.regressors)))
+            for j, (name, mu, std) in enumerate(self.regressors):
+                values[:, j] = (pd.to_numeric(regressors[name]).to_numpy(dtype=np.float64) - mu) / std
+            blocks.append(values)
+
+        if not blocks:
+            return np.zeros((n, 1))
+        return np.hstack(blocks)
+
+    def predict(self, dates, regressors=None):
+        """
+        Prédiction ponctuelle yhat pour un tableau de dates.
+
+        `regressors` est un DataFrame aligné sur `dates` contenant les
+        régresseurs du modèle ; à défaut ils sont calculés par add_regressors.
+        """
+        ds = _to_datetime64(dates)
+        if regressors is None and self.regressors:
+            regressors = add_regressors(pd.DataFrame({'ds': ds}), include_target=False)
+
+        t = (ds.view(np.int64) - self.start) / self.t_scale
+        trend = self.trend(t) * self.y_scale + self.floor
+
+        X = self.feature_matrix(ds, regressors)
+        multiplicative = X @ self.beta_multiplicative
+        additive = X @ self.beta_additive
+        return trend * (1 + multiplicative) + additive
+
+    def predict_frame(self, df):
+        """
+        Même interface que model.predict pour un DataFrame avec 'ds' et les
+        régresseurs : renvoie 'ds' et 'yhat', triés par date
+        """
+        df = df.sort_values('ds', kind='mergesort').reset_index(drop=True)
+        ds = pd.to_datetime(df['ds'])
+        return pd.DataFrame({'ds': ds, 'yhat': self.predict(ds, df)})
+
+
+def check_parity(model, evaluator, df, tolerance=1e-8):
+    """
+    Comparer l'évaluateur NumPy au chemin Prophet standard.
+    Renvoie l'écart relatif maximal observé et lève une erreur s'il dépasse
+    la tolérance.
+    """
+    expected = model.predict(df)['yhat'].to_numpy()
+    actual = evaluator.predict_frame(df)['yhat'].to_numpy()
+    error = float(np.max(np.abs(actual - expected) / np.maximum(1.0, np.abs(expected))))
+    if not error <= tolerance:
+        raise ValueError(f"Écart moteur NumPy / Prophet trop grand: {error:.3e} > {tolerance:.0e}")
+    return error
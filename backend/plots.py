@@ -0,0 +1,103 @@
+import io
+
+from downsample import downsample_frame
+from serialization import frame_to_columns
+
+# Champs des séries renvoyées au frontend pour ses graphiques
+CHART_FORECAST_FIELDS = {
+    "date": "ds",
+    "predicted_sales": "yhat",
+    "predicted_lower": "yhat_lower",
+    "predicted_upper": "yhat_upper"
+}
+CHART_ACTUAL_FIELDS = {"date": "ds", "actual_sales": "y"}
+
+
+def plot_source(kind, forecast, title, actual=None):
+    """
+    Données minimales nécessaires pour tracer un graphique plus tard
+    """
+    columns = [c for c in ('ds', 'yhat', 'yhat_lower', 'yhat_upper') if c in forecast.columns]
+    source = {"kind": kind, "title": title, "forecast": forecast[columns]}
+    if actual is not None:
+        source["actual"] = actual[['ds', 'y']]
+    return source
+
+
+def chart_data(source, max_points=None):
+    """
+    Séries d'un graphique à tracer côté client, réduites par LTTB à
+    `max_points` points chacune (toutes si None)
+    """
+    forecast = source["forecast"]
+    chart = {
+        "kind": source["kind"],
+        "title": source["title"],
+        "total_points": len(forecast),
+        "forecast": frame_to_columns(downsample_frame(forecast, 'yhat', max_points), CHART_FORECAST_FIELDS)
+    }
+    actual = source.get("actual")
+    if actual is not None and not actual['y'].isna().all():
+        chart["actual"] = frame_to_columns(downsample_frame(actual, 'y', max_points), CHART_ACTUAL_FIELDS)
+    return chart
+
+
+def render_forecast(source, ax):
+    forecast = source["forecast"]
+    ax.plot(forecast['ds'], forecast['yhat'], label='Prédiction', color='blue', linewidth=2)
+
+    if 'yhat_lower' in forecast.columns and 'yhat_upper' in forecast.columns:
+        ax.fill_between(
+            forecast['ds'],
+            forecast['yhat_lower'],
+            forecast['yhat_upper'],
+            alpha=0.2,
+            color='blue',
+            label='Intervalle de confiance'
+        )
+
+    ax.set_ylabel('Ventes prédites', fontsize=12)
+
+
+def render_comparison(source, ax):
+    forecast = source["forecast"]
+
+    # Tracer les prédictions
+    ax.plot(forecast['ds'], forecast['yhat'], label='Prédictions', color='blue', linewidth=2)
+
+    # Tracer les valeurs réelles si disponibles
+    actual = source.get("actual")
+    if actual is not None and not actual['y'].isna().all():
+        ax.scatter(actual['ds'], actual['y'],
+                   label='Ventes réelles', color='green', alpha=0.6, s=30)
+
+    ax.set_ylabel('Ventes', fontsize=12)
+
+
+RENDERERS = {
+    "forecast": ((12, 6), render_forecast),
+    "comparison": ((14, 7), render_comparison),
+}
+
+
+def render_png(source, dpi=100):
+    """
+    Tracer le graphique décrit par `source` et renvoyer les octets PNG
+    (API objet de matplotlib, sûre entre threads ; importée seulement ici)
+    """
+    from matplotlib.figure import Figure
+
+    figsize, renderer = RENDERERS[source["kind"]]
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    renderer(source, ax)
+
+    ax.set_title(source["title"], fontsize=14)
+    ax.set_xlabel('Date', fontsize=12)
+    ax.grid(True, alpha=0.3)
+    ax.legend()
+    fig.tight_layout()
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=dpi)
+    return buf.getvalue()
@@ -0,0 +1,206 @@
+"""
+Réentraînement incrémental : les ventes des jours clos sont ajoutées à
+l'historique du modèle, puis le modèle est réajusté en partant de ses
+paramètres actuels (démarrage à chaud). Stan converge alors en quelques
+itérations, là où un ajustement à froid repart de l'initialisation par
+défaut.
+
+Le nouveau modèle est publié comme une nouvelle version, sans toucher aux
+précédentes : <model-dir>/refit-<date>/global.pkl pour le modèle global,
+<model-dir>/refit-<date>/<dimension>/<valeur>.pkl pour un segment, référencé
+par le manifeste. Le backend le recharge comme un nouveau déploiement. Pour
+revenir en arrière, retirer l'entrée "default" (ou celle du segment) du
+manifeste ; un nouveau MODEL_PATH déployé l'emporte sur les réajustements
+obtenus à partir de l'ancien.
+
+Usage (depuis backend/) :
+    python refit.py --model prophet_model.pkl --observations ventes_du_jour.csv
+    python refit.py --model prophet_model.pkl --observations ventes_du_jour.csv --compare-cold
+    python refit.py --observations ventes_du_jour.csv --segment product_line:Children
+"""
+import argparse
+import os
+from datetime import datetime
+
+import joblib
+import pandas as pd
+
+import config
+from artifact import is_artifact
+from ingest import read_daily_series
+from registry import load_manifest, slugify, segment_path, default_model_path, model_version
+from train import fit_model, warm_start_params, complete_days, template_signature, series_hash, write_manifest
+from utils import add_regressors
+
+
+def merge_observations(history, observations):
+    """
+    Historique (ds, y) complété par les nouvelles observations journalières.
+    Une date déjà connue est remplacée (correction d'un jour clos) ; une
+    date antérieure au début de l'historique, ou un trou entre la fin de
+    l'historique et les nouvelles dates, est refusé : les jours manquants
+    seraient comptés comme des jours sans vente.
+    """
+    history = history[['ds', 'y']]
+    observations = observations[['ds', 'y']].copy()
+    observations['ds'] = pd.to_datetime(observations['ds']).dt.normalize()
+    observations = observations.groupby('ds', as_index=False)['y'].sum()
+    if observations.empty:
+        raise ValueError("Aucune nouvelle observation")
+
+    first, last = history['ds'].min(), history['ds'].max()
+    if observations['ds'].min() < first:
+        raise ValueError(
+            f"Observation du {observations['ds'].min().strftime('%Y-%m-%d')} antérieure au début "
+            f"de l'historique ({first.strftime('%Y-%m-%d')})"
+        )
+    first_new = observations.loc[observations['ds'] > last, 'ds'].min()
+    if pd.notna(first_new) and first_new > last + pd.Timedelta(days=1):
+        raise ValueError(
+            f"Observations manquantes entre le {(last + pd.Timedelta(days=1)).strftime('%Y-%m-%d')} "
+            f"et le {(first_new - pd.Timedelta(days=1)).strftime('%Y-%m-%d')}"
+        )
+
+    replaced = int(observations['ds'].isin(history['ds']).sum())
+    merged = pd.concat([history[~history['ds'].isin(observations['ds'])], observations], ignore_index=True)
+    merged = complete_days(merged.sort_values('ds'))
+    return merged, {"added": len(merged) - len(history), "replaced": replaced}
+
+
+def refit_model(model, observations, compare_cold=False):
+    """
+    Réajuster `model` sur son historique complété par `observations`.
+    Renvoie (nouveau modèle, rapport) ; avec compare_cold, un ajustement à
+    froid sur les mêmes données est aussi chronométré (puis abandonné).
+    """
+    series, counts = merge_observations(model.history, observations)
+    df = add_regressors(series, include_target=False)
+
+    new_model, warm_seconds, warm = fit_model(model, df, init=warm_start_params(model))
+    fit_seconds = {"warm" if warm else "cold": round(warm_seconds, 3)}
+    if compare_cold and warm:
+        _, cold_seconds, _ = fit_model(model, df)
+        fit_seconds["cold"] = round(cold_seconds, 3)
+
+    report = {
+        "refitted_at": datetime.now().isoformat(),
+        "history": {
+            "start": series['ds'].min().strftime('%Y-%m-%d'),
+            "end": series['ds'].max().strftime('%Y-%m-%d'),
+            "days": len(series)
+        },
+        "days_added": counts["added"],
+        "days_replaced": counts["replaced"],
+        "warm_start": warm,
+        "fit_seconds": fit_seconds
+    }
+    if "warm" in fit_seconds and "cold" in fit_seconds and fit_seconds["warm"] > 0:
+        report["speedup"] = round(fit_seconds["cold"] / fit_seconds["warm"], 2)
+    return new_model, report
+
+
+def load_refittable(path):
+    """
+    Modèle Prophet complet d'un pickle ; un artefact allégé ne garde que la
+    fin de son historique et ne peut pas être réajusté
+    """
+    if is_artifact(path):
+        raise ValueError(f"{path} est un artefact allégé sans historique complet ; réentraîner avec train.py")
+    return joblib.load(path)
+
+
+def publish_model(model, path):
+    """
+    Écriture atomique du modèle (fichier temporaire puis renommage)
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    joblib.dump(model, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _manifest_entry(model, relative_path, version, report):
+    return {
+        "path": relative_path,
+        "input_hash": series_hash(model.history[['ds', 'y']], template_signature(model)),
+        "format": "pickle",
+        "fit_seconds": report["fit_seconds"].get("warm", report["fit_seconds"].get("cold")),
+        "warm_start": report["warm_start"],
+        "days": report["history"]["days"],
+        "start": report["history"]["start"],
+        "end": report["history"]["end"],
+        "version": version,
+        "trained_at": report["refitted_at"]
+    }
+
+
+def publish_segment(model, model_dir, segment, report):
+    """
+    Écrire le modèle réajusté d'un segment sous une nouvelle version
+    (<model-dir>/refit-<date>/<dimension>/<valeur>.pkl) et le référencer
+    dans le manifeste ; l'ancien fichier est laissé en place
+    """
+    version = datetime.now().strftime("refit-%Y%m%d-%H%M%S-%f")
+    dimension, _, value = segment.partition(":")
+    relative_path = os.path.join(version, dimension, f"{slugify(value)}.pkl")
+    publish_model(model, os.path.join(model_dir, relative_path))
+
+    manifest = load_manifest(model_dir)
+    manifest.setdefault("segments", {})[segment] = _manifest_entry(model, relative_path, version, report)
+    write_manifest(model_dir, manifest)
+    return relative_path
+
+
+def publish_default(model, model_dir, source_path, report):
+    """
+    Écrire le modèle global réajusté sous une nouvelle version
+    (<model-dir>/refit-<date>/global.pkl) et le référencer comme entrée
+    "default" du manifeste, rattachée à la version déployée de `source_path`
+    (MODEL_PATH, jamais modifié) ; voir registry.default_model_path
+    """
+    version = datetime.now().strftime("refit-%Y%m%d-%H%M%S-%f")
+    relative_path = os.path.join(version, "global.pkl")
+    publish_model(model, os.path.join(model_dir, relative_path))
+
+    manifest = load_manifest(model_dir)
+    manifest["default"] = {
+        **_manifest_entry(model, relative_path, version, report),
+        "base_path": source_path,
+        "base_version": model_version(source_path)
+    }
+    write_manifest(model_dir, manifest)
+    return relative_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=config.MODEL_PATH, help="modèle global déployé (pickle joblib)")
+    parser.add_argument("--model-dir", default=config.MODEL_DIR, help="répertoire des versions et du manifeste")
+    parser.add_argument("--segment", default=None, help="segment à réajuster (défaut : modèle global)")
+    parser.add_argument("--observations", required=True, help="ventes des nouveaux jours (CSV, Parquet, Arrow)")
+    parser.add_argument("--compare-cold", action="store_true", help="chronométrer aussi un ajustement à froid")
+    args = parser.parse_args()
+
+    if args.segment is None:
+        current = default_model_path(args.model_dir, args.model)
+    else:
+        entry = load_manifest(args.model_dir)["segments"].get(args.segment)
+        current = (os.path.join(args.model_dir, entry["path"]) if entry is not None
+                   else segment_path(args.model_dir, args.segment))
+    model = load_refittable(current)
+    with open(args.observations, "rb") as f:
+        observations = read_daily_series(f, config.MAX_UPLOAD_BYTES, config.MAX_UPLOAD_DECOMPRESSED_BYTES)
+    new_model, report = refit_model(model, observations, compare_cold=args.compare_cold)
+    if args.segment is None:
+        relative_path = publish_default(new_model, args.model_dir, args.model, report)
+    else:
+        relative_path = publish_segment(new_model, args.model_dir, args.segment, report)
+
+    seconds = ", ".join(f"{start} {value:.1f}s" for start, value in report["fit_seconds"].items())
+    print(f"{report['days_added']} jour(s) ajouté(s), {report['days_replaced']} remplacé(s) ; "
+          f"historique jusqu'au {report['history']['end']} ; ajustement : {seconds}")
+    print(f"Modèle écrit dans {os.path.join(args.model_dir, relative_path)} (depuis {current})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,514 @@
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from utils import create_future_dates, add_regressors, model_for_interval_mode
+from forecast_table import ForecastTable
+from numpy_engine import NumpyProphet, check_parity
+from artifact import META_FILE, is_artifact, load_artifact
+
+# Dimensions de segmentation -> colonnes de dataset/product-supplier.csv
+SEGMENT_DIMENSIONS = {
+    "product_line": "Product Line",
+    "category": "Product Category",
+    "group": "Product Group",
+    "supplier": "Supplier Name",
+}
+
+
+def slugify(value):
+    return re.sub(r"[^a-z0-9]+", "-", str(value).lower()).strip("-")
+
+
+def parse_segment(segment):
+    """
+    Découper un segment 'dimension:valeur' (ex. 'product_line:Children')
+    """
+    dimension, sep, value = segment.partition(":")
+    if not sep or dimension not in SEGMENT_DIMENSIONS or not value:
+        raise ValueError(
+            f"Segment invalide: '{segment}'. Format attendu 'dimension:valeur', "
+            f"dimensions: {', '.join(SEGMENT_DIMENSIONS)}"
+        )
+    return dimension, value
+
+
+def segment_path(model_dir, segment):
+    """
+    Modèle d'un segment : artefact <model_dir>/<dimension>/<valeur>/ s'il
+    existe, sinon pickle <model_dir>/<dimension>/<valeur>.pkl
+    """
+    dimension, value = parse_segment(segment)
+    path = os.path.join(model_dir, dimension, slugify(value))
+    if is_artifact(path):
+        return path
+    return path + ".pkl"
+
+
+MANIFEST_NAME = "manifest.json"
+
+
+def load_manifest(model_dir):
+    """
+    Manifeste écrit par train.py : segment -> fichier du modèle, version, etc.
+    """
+    path = os.path.join(model_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"version": None, "segments": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def model_version(path):
+    """
+    Version d'un modèle : empreinte courte de son fichier (de meta.json
+    pour un artefact allégé)
+    """
+    target = os.path.join(path, META_FILE) if is_artifact(path) else path
+    digest = hashlib.sha256()
+    with open(target, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def default_model_path(model_dir, path):
+    """
+    Fichier du modèle global à servir : le dernier réajustement publié dans
+    le manifeste (entrée "default", voir refit.py) s'il a été obtenu à partir
+    de la version actuelle de `path`, sinon `path` lui-même (aucun
+    réajustement, ou nouveau modèle déployé depuis)
+    """
+    entry = load_manifest(model_dir).get("default")
+    if entry is None or not os.path.exists(path):
+        return path
+    refit_path = os.path.join(model_dir, entry["path"])
+    if os.path.exists(refit_path) and entry.get("base_version") == model_version(path):
+        return refit_path
+    return path
+
+
+def load_segments(csv_path):
+    """
+    Segments connus d'après les hiérarchies produit / fournisseur
+    """
+    df = pd.read_csv(csv_path, encoding="utf-8-sig", usecols=list(SEGMENT_DIMENSIONS.values()))
+    segments = []
+    for dimension, column in SEGMENT_DIMENSIONS.items():
+        segments.extend(f"{dimension}:{value}" for value in sorted(df[column].dropna().unique()))
+    return segments
+
+
+def memory_size(obj, seen=None):
+    """
+    Taille en mémoire (octets) d'un objet et de ce qu'il référence :
+    tableaux NumPy, DataFrame pandas (chaînes comprises), conteneurs et
+    attributs d'objets, chacun compté une fois
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+        # Une vue ne possède pas ses données : seul son tableau de base compte
+        # (un tableau projeté en mémoire depuis un fichier compte en entier)
+        return memory_size(obj.base, seen) if isinstance(obj.base, np.ndarray) else obj.nbytes
+    if isinstance(obj, (pd.DataFrame, pd.Series, pd.Index)):
+        usage = obj.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(memory_size(k, seen) + memory_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(memory_size(item, seen) for item in obj)
+    elif hasattr(obj, "__dict__") and not isinstance(obj, type):
+        size += memory_size(vars(obj), seen)
+    return size
+
+
+@dataclass
+class ModelBundle:
+    """
+    Un modèle chargé et les structures d'inférence qui en dérivent.
+    Chargé depuis un artefact allégé, le modèle Prophet n'est décodé
+    (par `model_loader`) qu'au premier appel de get_model().
+    `size_bytes` est la taille en mémoire (voir measure), pas celle du
+    fichier.
+    """
+    model: object = None
+    segment: Optional[str] = None
+    forecast_table: Optional[ForecastTable] = None
+    numpy_model: Optional[NumpyProphet] = None
+    model_loader: Optional[Callable] = None
+    path: Optional[str] = None
+    version: Optional[str] = None
+    size_bytes: int = 0
+    load_seconds: float = 0.0
+    warm_seconds: float = 0.0
+    loaded_at: float = field(default_factory=time.time)
+    _model_lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    @property
+    def engine(self):
+        return "numpy" if self.numpy_model is not None else "prophet"
+
+    def measure(self):
+        """
+        Mettre à jour size_bytes : modèle Prophet (s'il est décodé), moteur
+        NumPy et table des prédictions
+        """
+        self.size_bytes = memory_size((self.model, self.numpy_model, self.forecast_table))
+        return self.size_bytes
+
+    def get_model(self):
+        """
+        Modèle Prophet, décodé à la première demande
+        """
+        if self.model is None and self.model_loader is not None:
+            with self._model_lock:
+                if self.model is None:
+                    self.model = self.model_loader()
+                    self.measure()
+        if self.model is None:
+            raise ValueError("Modèle non chargé")
+        return self.model
+
+
+def build_bundle(model, segment=None, engine="prophet", table_enabled=True,
+                 table_start=None, table_end=None, table_horizon_days=730):
+    """
+    Préparer un modèle pour l'inférence : moteur NumPy (validé contre
+    Prophet) et table des prédictions journalières
+    """
+    label = segment or "global"
+    bundle = ModelBundle(model=model, segment=segment)
+
+    # Moteur NumPy pour les prédictions ponctuelles, validé contre Prophet
+    if engine == "numpy":
+        try:
+            numpy_model = NumpyProphet.from_model(model)
+            parity_df = add_regressors(
+                create_future_dates(model.history['ds'].min(), len(model.history) + 365),
+                include_target=False
+            )
+            error = check_parity(model_for_interval_mode(model, "none"), numpy_model, parity_df)
+            bundle.numpy_model = numpy_model
+            print(f"[{label}] Moteur NumPy activé (écart max avec Prophet: {error:.1e})")
+        except Exception as e:
+            print(f"[{label}] Moteur NumPy indisponible, retour à Prophet: {e}")
+
+    # Précalculer les prédictions journalières sur toute la plage configurée
+    if table_enabled:
+        try:
+            bundle.forecast_table = ForecastTable.build(
+                model, start=table_start, end=table_end, horizon_days=table_horizon_days
+            )
+            print(f"[{label}] Table de prédictions construite: "
+                  f"{bundle.forecast_table.start} -> {bundle.forecast_table.end}")
+        except Exception as e:
+            print(f"[{label}] Erreur lors de la construction de la table de prédictions: {e}")
+
+    return bundle
+
+
+def load_bundle(path, segment=None, **build_options):
+    """
+    Charger un modèle depuis un artefact allégé (répertoire) ou un pickle
+    """
+    start = time.perf_counter()
+    version = model_version(path)
+    if is_artifact(path):
+        numpy_model, forecast_table, model_loader, _ = load_artifact(path)
+        bundle = ModelBundle(
+            segment=segment,
+            forecast_table=forecast_table,
+            # Sans moteur NumPy configuré, le modèle Prophet sert aussi yhat
+            numpy_model=numpy_model if build_options.get("engine") == "numpy" else None,
+            model_loader=model_loader
+        )
+        if not build_options.get("table_enabled", True):
+            bundle.forecast_table = None
+    else:
+        bundle = build_bundle(joblib.load(path), segment=segment, **build_options)
+    bundle.measure()
+    bundle.path = path
+    bundle.version = version
+    bundle.load_seconds = time.perf_counter() - start
+    return bundle
+
+
+def warm_bundle(bundle, periods=7):
+    """
+    Prédiction de test avant la mise en service d'un modèle. Le modèle
+    Prophet d'un artefact n'est pas décodé ici : il le sera par la première
+    requête qui en a besoin (moteur NumPy inactif, intervalles hors table).
+    """
+    start = time.perf_counter()
+    checks = []
+    if bundle.forecast_table is not None:
+        checks.append(bundle.forecast_table.lookup(str(bundle.forecast_table.start), periods)['yhat'])
+    if bundle.numpy_model is not None or bundle.model is not None:
+        future_enriched = add_regressors(
+            create_future_dates(pd.Timestamp.today().normalize(), periods), include_target=False
+        )
+        if bundle.numpy_model is not None:
+            checks.append(bundle.numpy_model.predict_frame(future_enriched)['yhat'])
+        else:
+            checks.append(model_for_interval_mode(bundle.model, "none").predict(future_enriched)['yhat'])
+    if not all(np.isfinite(np.asarray(yhat, dtype=np.float64)).all() for yhat in checks):
+        raise ValueError(f"Prédiction de test invalide pour le modèle {bundle.version}")
+    bundle.warm_seconds = time.perf_counter() - start
+
+
+class ModelRegistry:
+    """
+    Modèles par segment, chargés à la première utilisation et évincés
+    (LRU) au-delà du budget mémoire (somme des size_bytes, relue à chaque
+    chargement : un modèle Prophet décodé depuis compte). Le modèle global
+    (segment None) est toujours gardé.
+    """
+
+    def __init__(self, model_dir, max_bytes, build_options=None, segments=None):
+        self.model_dir = model_dir
+        self.max_bytes = max_bytes
+        self.build_options = build_options or {}
+        self.segments = set(segments) if segments is not None else None
+        self.default = None
+        self._bundles = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._loading = {}  # segment -> verrou de chargement
+        self._manifest = None
+        self._manifest_mtime = None
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.load_errors = 0
+        self.evictions = 0
+        self.load_seconds_total = 0.0
+        self.load_seconds_max = 0.0
+        self.default_source = None  # MODEL_PATH déployé
+        self.default_path = None  # fichier servi : MODEL_PATH ou son dernier réajustement
+        self._reload_lock = threading.Lock()
+        self.reloads = 0
+        self.reload_errors = 0
+        self.last_reload = None
+
+    def set_default(self, bundle):
+        self.default = bundle
+
+    def load_default(self, path):
+        """
+        Charger et préchauffer le modèle global (ou son dernier réajustement)
+        """
+        self.default_source = path
+        path = default_model_path(self.model_dir, path)
+        bundle = load_bundle(path, **self.build_options)
+        warm_bundle(bundle)
+        self.default_path = path
+        self.set_default(bundle)
+        return bundle
+
+    def _replacement(self, old, path, segment=None):
+        """
+        Nouveau modèle préchauffé si le fichier a changé, sinon None
+        """
+        if old is not None and path == old.path and model_version(path) == old.version:
+            return None
+        bundle = load_bundle(path, segment=segment, **self.build_options)
+        warm_bundle(bundle)
+        return bundle
+
+    def reload(self, path=None):
+        """
+        Recharger le modèle global et les segments chargés dont le fichier a
+        changé. Chaque nouveau modèle est chargé et préchauffé à côté de
+        l'ancien puis substitué d'un coup : les requêtes en cours terminent
+        sur l'ancienne version. Renvoie {segment ou 'default': {from, to}}.
+        """
+        with self._reload_lock:
+            changed = {}
+            try:
+                if path is None and self.default_source is not None:
+                    path = default_model_path(self.model_dir, self.default_source)
+                if path is not None:
+                    old = self.default
+                    bundle = self._replacement(old, path)
+                    if bundle is not None:
+                        self.default_path = path
+                        self.set_default(bundle)
+                        changed["default"] = {"from": old.version if old else None, "to": bundle.version}
+
+                with self._lock:
+                    loaded = list(self._bundles.items())
+                for segment, old in loaded:
+                    segment_file = self.path_for(segment)
+                    if not os.path.exists(segment_file):
+                        continue
+                    bundle = self._replacement(old, segment_file, segment)
+                    if bundle is None:
+                        continue
+                    with self._lock:
+                        if self._bundles.get(segment) is old:
+                            self._bundles[segment] = bundle
+                            self._bytes = self._resident_bytes()
+                    changed[segment] = {"from": old.version, "to": bundle.version}
+            except Exception:
+                self.reload_errors += 1
+                raise
+            self.reloads += 1
+            self.last_reload = time.time()
+            return changed
+
+    def watched_state(self):
+        """
+        Dates de modification du modèle global et du manifeste, pour
+        détecter un nouveau déploiement
+        """
+        paths = [os.path.join(self.model_dir, MANIFEST_NAME)]
+        if self.default_source is not None:
+            paths.append(
+                os.path.join(self.default_source, META_FILE) if is_artifact(self.default_source)
+                else self.default_source
+            )
+        state = []
+        for path in paths:
+            try:
+                state.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                state.append(None)
+        return tuple(state)
+
+    def manifest(self):
+        """
+        Manifeste du répertoire des modèles, relu quand le fichier change
+        """
+        path = os.path.join(self.model_dir, MANIFEST_NAME)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            mtime = None
+        if self._manifest is None or mtime != self._manifest_mtime:
+            self._manifest = load_manifest(self.model_dir)
+            self._manifest_mtime = mtime
+        return self._manifest
+
+    def path_for(self, segment):
+        """
+        Fichier du modèle d'un segment : celui du manifeste s'il y figure,
+        sinon l'emplacement par défaut (voir segment_path)
+        """
+        entry = self.manifest()["segments"].get(segment)
+        if entry is not None:
+            return os.path.join(self.model_dir, entry["path"])
+        return segment_path(self.model_dir, segment)
+
+    def get(self, segment=None):
+        """
+        Modèle d'un segment (ou modèle global si segment est None)
+        """
+        if segment is None:
+            if self.default is None:
+                raise ValueError("Modèle non chargé")
+            return self.default
+
+        parse_segment(segment)
+        if not self.is_known(segment):
+            raise ValueError(f"Segment inconnu: '{segment}'")
+
+        with self._lock:
+            bundle = self._bundles.get(segment)
+            if bundle is not None:
+                self._bundles.move_to_end(segment)
+                self.hits += 1
+                return bundle
+            self.misses += 1
+            loading = self._loading.setdefault(segment, threading.Lock())
+
+        # Un seul chargement par segment, même sous requêtes concurrentes
+        with loading:
+            with self._lock:
+                bundle = self._bundles.get(segment)
+            if bundle is None:
+                bundle = self._load(segment)
+        return bundle
+
+    def _resident_bytes(self):
+        # Appelé sous self._lock
+        return sum(bundle.size_bytes for bundle in self._bundles.values())
+
+    def _load(self, segment):
+        try:
+            path = self.path_for(segment)
+            if not os.path.exists(path):
+                raise ValueError(f"Aucun modèle pour le segment '{segment}'")
+            bundle = load_bundle(path, segment=segment, **self.build_options)
+
+            with self._lock:
+                self._bundles[segment] = bundle
+                self.loads += 1
+                self.load_seconds_total += bundle.load_seconds
+                self.load_seconds_max = max(self.load_seconds_max, bundle.load_seconds)
+                self._bytes = self._resident_bytes()
+                while self._bytes > self.max_bytes and len(self._bundles) > 1:
+                    _, evicted = self._bundles.popitem(last=False)
+                    self._bytes -= evicted.size_bytes
+                    self.evictions += 1
+            return bundle
+        except Exception:
+            with self._lock:
+                self.load_errors += 1
+            raise
+        finally:
+            # Même après un échec : pas de verrou de chargement orphelin
+            with self._lock:
+                self._loading.pop(segment, None)
+
+    def is_known(self, segment):
+        """
+        Segment du catalogue produits / fournisseurs ou entraîné (manifeste)
+        """
+        return self.segments is None or segment in self.segments or segment in self.manifest()["segments"]
+
+    def available_segments(self):
+        """
+        Segments pour lesquels un fichier de modèle existe
+        """
+        candidates = set(self.manifest()["segments"])
+        if self.segments is not None:
+            candidates |= self.segments
+        return sorted(s for s in candidates if os.path.exists(self.path_for(s)))
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "loaded": {segment: bundle.version for segment, bundle in self._bundles.items()},
+                "default_version": self.default.version if self.default is not None else None,
+                "manifest_version": self.manifest()["version"],
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "loads": self.loads,
+                "load_errors": self.load_errors,
+                "evictions": self.evictions,
+                "load_seconds_total": self.load_seconds_total,
+                "load_seconds_max": self.load_seconds_max,
+                "reloads": self.reloads,
+                "reload_errors": self.reload_errors,
+                "last_reload": self.last_reload
+            }
@@ -0,0 +1,141 @@
+import json
+
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse, Response
+
+from metrics import stage
+
+# Encodeur JSON rapide si orjson est installé
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse as _FastJSONBase
+except ImportError:
+    orjson = None
+    _FastJSONBase = JSONResponse
+
+# Flux Arrow IPC (réponses pour les clients pandas / polars) si pyarrow est installé
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+class TimedJSONResponse(JSONResponse):
+    """Réponse JSON standard dont l'encodage est mesuré (étape 'encode')"""
+
+    def render(self, content):
+        with stage("encode"):
+            return super().render(content)
+
+
+class FastJSONResponse(_FastJSONBase):
+    """Réponse JSON encodée avec orjson si disponible, encodage mesuré"""
+
+    def render(self, content):
+        with stage("encode"):
+            return super().render(content)
+
+class ArrowStreamResponse(Response):
+    """Prédictions au format flux Arrow IPC (octets déjà encodés)"""
+    media_type = ARROW_STREAM_MEDIA_TYPE
+
+
+def negotiate_format(accept):
+    """
+    "arrow" si l'en-tête Accept demande un flux Arrow IPC, sinon "json".
+    406 si seul Arrow est accepté et que pyarrow n'est pas installé.
+    """
+    media_types = [part.split(";")[0].strip().lower() for part in (accept or "").split(",")]
+    if ARROW_STREAM_MEDIA_TYPE not in media_types:
+        return "json"
+    if pa is not None:
+        return "arrow"
+    if any(m in ("application/json", "application/*", "*/*") for m in media_types):
+        return "json"
+    raise HTTPException(status_code=406, detail="Réponse Arrow indisponible : installez le paquet 'pyarrow'")
+
+# Nom du champ dans la réponse -> colonne du DataFrame de prédiction
+FORECAST_FIELDS = {
+    "date": "ds",
+    "predicted_sales": "yhat",
+    "predicted_lower": "yhat_lower",
+    "predicted_upper": "yhat_upper"
+}
+
+
+def dates_to_strings(values):
+    """
+    Formater un tableau de dates en 'YYYY-MM-DD', sans strftime ligne par ligne
+    """
+    days = pd.to_datetime(values).to_numpy().astype('datetime64[D]')
+    return np.datetime_as_string(days).tolist()
+
+
+def numbers_to_list(values):
+    """
+    Convertir un tableau numérique en liste de float, NaN -> None
+    """
+    values = np.asarray(values, dtype=np.float64)
+    result = values.tolist()
+    if np.isnan(values).any():
+        result = [None if v != v else v for v in result]
+    return result
+
+
+def frame_to_columns(df, fields=FORECAST_FIELDS, fill_missing=False):
+    """
+    Convertir un DataFrame en colonnes {"champ": [...]}, de façon vectorisée.
+    Les colonnes absentes sont ignorées, ou remplies de None si fill_missing.
+    """
+    columns = {}
+    for name, column in fields.items():
+        if column in df.columns:
+            series = df[column]
+            if pd.api.types.is_datetime64_any_dtype(series):
+                columns[name] = dates_to_strings(series)
+            elif pd.api.types.is_numeric_dtype(series):
+                columns[name] = numbers_to_list(series)
+            else:
+                columns[name] = series.tolist()
+        elif fill_missing:
+            columns[name] = [None] * len(df)
+    return columns
+
+
+def columns_to_rows(columns):
+    """
+    Passer du format colonnes au format lignes [{"champ": valeur}, ...]
+    """
+    names = list(columns)
+    return [dict(zip(names, values)) for values in zip(*columns.values())]
+
+
+def serialize_frame(df, layout="rows", fields=FORECAST_FIELDS, fill_missing=False):
+    """
+    Sérialiser un DataFrame au format demandé : "rows" ou "columns"
+    """
+    columns = frame_to_columns(df, fields, fill_missing)
+    if layout == "columns":
+        return columns
+    return columns_to_rows(columns)
+
+
+def frame_to_arrow(df, fields=FORECAST_FIELDS, metadata=None):
+    """
+    Encoder un DataFrame en flux Arrow IPC, colonnes renommées comme dans
+    les réponses JSON ; `metadata` (valeurs JSON) va dans le schéma
+    """
+    columns = {name: column for name, column in fields.items() if column in df.columns}
+    frame = df[list(columns.values())]
+    frame.columns = list(columns)
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    if metadata:
+        table = table.replace_schema_metadata({key: json.dumps(value) for key, value in metadata.items()})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
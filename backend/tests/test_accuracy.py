@@ -0,0 +1,81 @@
+"""
+Parité des métriques d'erreur d'accuracy.py avec scikit-learn : une série,
+plusieurs horizons, morceaux fusionnés (merge) et ventes grandes devant
+leur dispersion
+"""
+import numpy as np
+import pytest
+
+from accuracy import BLOCK_ROWS, ErrorAccumulator, error_metrics
+
+metrics = pytest.importorskip("sklearn.metrics")
+
+TOLERANCE = 1e-9
+
+
+def expected_metrics(y_true, y_pred):
+    """
+    Métriques de référence : scikit-learn, et NumPy pour le sMAPE et le
+    biais qu'il ne fournit pas (séries sans zéro)
+    """
+    return {
+        "MAE": metrics.mean_absolute_error(y_true, y_pred),
+        "RMSE": np.sqrt(metrics.mean_squared_error(y_true, y_pred)),
+        "R2": metrics.r2_score(y_true, y_pred),
+        "MAPE": metrics.mean_absolute_percentage_error(y_true, y_pred) * 100,
+        "sMAPE": np.mean(2 * np.abs(y_pred - y_true) / (np.abs(y_true) + np.abs(y_pred))) * 100,
+        "Bias": np.mean(y_pred - y_true)
+    }
+
+
+def assert_close(actual, expected):
+    for name, value in expected.items():
+        assert actual[name] == pytest.approx(value, rel=TOLERANCE, abs=TOLERANCE), name
+
+
+@pytest.fixture
+def sales():
+    rng = np.random.default_rng(0)
+    y_true = rng.uniform(50, 500, 3 * BLOCK_ROWS + 123)
+    y_pred = y_true + rng.normal(0, 30, len(y_true))
+    return y_true, y_pred
+
+
+def test_error_metrics(sales):
+    assert_close(error_metrics(*sales), expected_metrics(*sales))
+
+
+def test_large_offset():
+    # Ventes ~1e9 et dispersion ~1 : la formule naïve de la variance échoue
+    rng = np.random.default_rng(1)
+    y_true = 1e9 + rng.normal(0, 1, 50_000)
+    y_pred = y_true + rng.normal(0, 0.5, len(y_true))
+    assert_close(error_metrics(y_true, y_pred), expected_metrics(y_true, y_pred))
+
+
+def test_merge_of_chunks(sales):
+    y_true, y_pred = sales
+    merged = ErrorAccumulator()
+    for chunk in np.array_split(np.arange(len(y_true)), 7):
+        merged.merge(ErrorAccumulator().update(y_true[chunk], y_pred[chunk]))
+    assert_close(merged.summary(), expected_metrics(y_true, y_pred))
+
+
+def test_horizons_and_overall(sales):
+    y_true, y_pred = sales
+    horizons = 5
+    rows = len(y_true) // horizons * horizons
+    y_true, y_pred = y_true[:rows].reshape(-1, horizons), y_pred[:rows].reshape(-1, horizons)
+
+    first = ErrorAccumulator(horizons).update(y_true[:1000], y_pred[:1000])
+    accumulator = first.merge(ErrorAccumulator(horizons).update(y_true[1000:], y_pred[1000:]))
+    by_horizon = accumulator.summary()
+    for h in range(horizons):
+        assert_close({name: values[h] for name, values in by_horizon.items()},
+                      expected_metrics(y_true[:, h], y_pred[:, h]))
+    assert_close(accumulator.overall().summary(), expected_metrics(y_true.ravel(), y_pred.ravel()))
+
+
+def test_merge_rejects_other_horizons():
+    with pytest.raises(ValueError, match="Horizons différents"):
+        ErrorAccumulator(2).merge(ErrorAccumulator(3))
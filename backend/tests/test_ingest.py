@@ -0,0 +1,32 @@
+"""
+Lecture des fichiers envoyés à /predict-csv : noms de colonnes acceptés et
+fichiers compressés corrompus
+"""
+import gzip
+import io
+
+import pytest
+
+from ingest import read_daily_series
+
+MAX_BYTES = 1 << 20
+
+
+def read(content):
+    return read_daily_series(io.BytesIO(content), MAX_BYTES, MAX_BYTES)
+
+
+@pytest.mark.parametrize("header", [b"date,sales", b"ds,y", b"Date Order was placed,Total Retail Price for This Order"])
+def test_accepted_column_names(header):
+    series = read(header + b"\n2021-09-01,10\n2021-09-01,5\n2021-09-02,7\n")
+    assert series['y'].tolist() == [15.0, 7.0]
+
+
+def test_gzip_upload():
+    assert len(read(gzip.compress(b"ds,y\n2021-09-01,10\n2021-09-02,7\n"))) == 2
+
+
+def test_truncated_gzip_is_a_value_error():
+    content = gzip.compress(b"ds,y\n" + b"2021-09-01,10\n" * 1000)
+    with pytest.raises(ValueError, match="Fichier illisible"):
+        read(content[:len(content) // 2])
@@ -0,0 +1,84 @@
+"""
+Parité du moteur NumPy avec Prophet : yhat, tendance et composantes
+saisonnières, sur le modèle livré (saisonnalités multiplicatives, jours
+spéciaux, régresseurs) et sur un petit modèle additif ajusté pour le test.
+"""
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from numpy_engine import NumpyProphet, check_parity
+from utils import add_regressors, create_future_dates
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), "..", "prophet_model.pkl")
+TOLERANCE = 1e-8
+
+
+def relative_error(actual, expected):
+    return float(np.max(np.abs(actual - expected) / np.maximum(1.0, np.abs(expected))))
+
+
+def components(evaluator, model, df):
+    """
+    Tendance et composantes saisonnières recalculées par le moteur NumPy,
+    dans les unités de model.predict (relatives pour le mode multiplicatif)
+    """
+    ds = pd.to_datetime(df['ds']).to_numpy()
+    t = (ds.view(np.int64) - evaluator.start) / evaluator.t_scale
+    X = evaluator.feature_matrix(ds, df)
+    result = {"trend": evaluator.trend(t) * evaluator.y_scale + evaluator.floor}
+    for name, props in model.seasonalities.items():
+        columns = [j for j, column in enumerate(evaluator.columns) if column.startswith(f"{name}_delim_")]
+        beta = evaluator.beta_multiplicative if props['mode'] == 'multiplicative' else evaluator.beta_additive
+        result[name] = X[:, columns] @ beta[columns]
+    return result
+
+
+@pytest.fixture(scope="module")
+def shipped_model():
+    return joblib.load(MODEL_PATH)
+
+
+@pytest.fixture(scope="module")
+def additive_model():
+    prophet = pytest.importorskip("prophet")
+    rng = np.random.default_rng(0)
+    ds = pd.date_range("2020-01-01", periods=730, freq="D")
+    day = np.arange(len(ds))
+    y = 100 + 0.05 * day + 10 * np.sin(2 * np.pi * day / 365.25) + 5 * (ds.dayofweek >= 5) + rng.normal(0, 1, len(ds))
+    model = prophet.Prophet(yearly_seasonality=3, weekly_seasonality=True, daily_seasonality=False,
+                            seasonality_mode="additive", uncertainty_samples=0)
+    model.fit(pd.DataFrame({'ds': ds, 'y': y}))
+    return model
+
+
+def test_shipped_model_yhat(shipped_model):
+    evaluator = NumpyProphet.from_model(shipped_model)
+    df = add_regressors(create_future_dates("2016-06-01", 2500), include_target=False)
+    assert check_parity(shipped_model, evaluator, df, TOLERANCE) <= TOLERANCE
+
+
+@pytest.mark.parametrize("fixture", ["shipped_model", "additive_model"])
+def test_trend_and_seasonal_components(fixture, request):
+    model = request.getfixturevalue(fixture)
+    evaluator = NumpyProphet.from_model(model)
+    future = create_future_dates("2020-06-01", 900)
+    df = add_regressors(future, include_target=False) if model.extra_regressors else future
+    expected = model.predict(df)
+
+    actual = components(evaluator, model, df)
+    assert set(actual) == {"trend", *model.seasonalities}
+    for name, values in actual.items():
+        assert relative_error(values, expected[name].to_numpy()) <= TOLERANCE, name
+    assert relative_error(evaluator.predict_frame(df)['yhat'].to_numpy(), expected['yhat'].to_numpy()) <= TOLERANCE
+
+
+def test_check_parity_rejects_a_drifting_evaluator(shipped_model):
+    evaluator = NumpyProphet.from_model(shipped_model)
+    evaluator.k *= 1.01
+    df = add_regressors(create_future_dates("2021-01-01", 60), include_target=False)
+    with pytest.raises(ValueError, match="Écart moteur NumPy"):
+        check_parity(shipped_model, evaluator, df, TOLERANCE)
@@ -0,0 +1,338 @@
+"""
+Entraînement des modèles Prophet par segment (ligne de produit, catégorie,
+groupe, fournisseur), en parallèle sur un pool de processus.
+
+Usage (depuis backend/) :
+    python train.py --orders ventes.csv --dimensions product_line supplier
+    python train.py --series series.csv          # colonnes segment, ds, y
+
+Les modèles sont écrits dans <model-dir>/<version>/<dimension>/<valeur>.pkl
+et référencés par <model-dir>/manifest.json, que le backend lit pour
+trouver le modèle d'un segment. Le manifeste est mis à jour après chaque
+segment : une exécution interrompue reprend là où elle s'était arrêtée, et
+les segments dont les données n'ont pas changé ne sont pas réentraînés.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+
+import config
+from artifact import export_artifact, is_artifact, load_artifact
+from ingest import COLUMN_MAPPING, normalize_columns
+from registry import MANIFEST_NAME, SEGMENT_DIMENSIONS, load_manifest, slugify
+from utils import add_regressors
+
+
+def prophet_like(template):
+    """
+    Nouveau modèle Prophet, non entraîné, avec la configuration d'un modèle
+    existant (saisonnalités, jours spéciaux, régresseurs, priors)
+    """
+    from prophet import Prophet
+
+    model = Prophet(
+        growth=template.growth,
+        n_changepoints=template.n_changepoints,
+        changepoint_range=template.changepoint_range,
+        yearly_seasonality=False,
+        weekly_seasonality=False,
+        daily_seasonality=False,
+        holidays=template.holidays,
+        seasonality_mode=template.seasonality_mode,
+        seasonality_prior_scale=template.seasonality_prior_scale,
+        holidays_prior_scale=template.holidays_prior_scale,
+        changepoint_prior_scale=template.changepoint_prior_scale,
+        mcmc_samples=template.mcmc_samples,
+        interval_width=template.interval_width,
+        uncertainty_samples=template.uncertainty_samples,
+        scaling=template.scaling,
+        holidays_mode=template.holidays_mode
+    )
+    for name, props in template.seasonalities.items():
+        model.add_seasonality(
+            name=name,
+            period=props['period'],
+            fourier_order=props['fourier_order'],
+            prior_scale=props['prior_scale'],
+            mode=props['mode'],
+            condition_name=props['condition_name']
+        )
+    for name, props in template.extra_regressors.items():
+        model.add_regressor(name, prior_scale=props['prior_scale'],
+                            standardize=props['standardize'], mode=props['mode'])
+    if template.country_holidays is not None:
+        model.add_country_holidays(template.country_holidays)
+    return model
+
+
+def warm_start_params(model):
+    """
+    Paramètres ajustés d'un modèle, au format de `fit(init=...)` : un nouvel
+    ajustement part de ce point au lieu de l'initialisation par défaut
+    """
+    return {
+        'k': float(model.params['k'][0][0]),
+        'm': float(model.params['m'][0][0]),
+        'sigma_obs': float(model.params['sigma_obs'][0][0]),
+        'delta': model.params['delta'][0],
+        'beta': model.params['beta'][0],
+    }
+
+
+def fit_model(template, df, init=None):
+    """
+    Nouveau modèle configuré comme `template`, ajusté sur df en partant de
+    `init` si possible. Renvoie (modèle, durée en secondes, démarrage à
+    chaud effectif) ; si `init` ne convient pas (moins de points de rupture
+    sur un historique court), l'ajustement repart de zéro.
+    """
+    model = prophet_like(template)
+    # Nombre de points de rupture que Prophet retiendra pour cet historique
+    changepoints = min(template.n_changepoints, int(np.floor(len(df) * template.changepoint_range)) - 1)
+    if init is not None and (template.specified_changepoints or len(init['delta']) != changepoints):
+        init = None
+    start = time.perf_counter()
+    if init is not None:
+        try:
+            model.fit(df, init=init)
+            return model, time.perf_counter() - start, True
+        except (ValueError, RuntimeError):
+            model = prophet_like(template)
+            start = time.perf_counter()
+    model.fit(df)
+    return model, time.perf_counter() - start, False
+
+
+def load_template(path):
+    """
+    Modèle de référence : pickle joblib ou modèle Prophet d'un artefact allégé
+    """
+    if is_artifact(path):
+        return load_artifact(path)[2]()
+    return joblib.load(path)
+
+
+def template_signature(template):
+    """
+    Empreinte de la configuration du modèle de référence
+    """
+    signature = {
+        "growth": template.growth,
+        "n_changepoints": template.n_changepoints,
+        "changepoint_range": template.changepoint_range,
+        "seasonality_mode": template.seasonality_mode,
+        "priors": [template.seasonality_prior_scale, template.holidays_prior_scale,
+                   template.changepoint_prior_scale],
+        "seasonalities": template.seasonalities,
+        "regressors": {name: props['prior_scale'] for name, props in template.extra_regressors.items()},
+        "holidays": None if template.holidays is None else template.holidays.to_json(date_format="iso"),
+    }
+    return hashlib.sha256(json.dumps(signature, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def series_hash(series, signature):
+    """
+    Empreinte des données d'entraînement d'un segment
+    """
+    digest = hashlib.sha256(signature.encode())
+    digest.update(series['ds'].to_numpy(dtype='datetime64[ns]').tobytes())
+    digest.update(series['y'].to_numpy(dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def complete_days(series):
+    """
+    Série journalière continue : les jours sans vente valent 0
+    """
+    series = series.groupby('ds', as_index=False)['y'].sum()
+    days = pd.date_range(series['ds'].min(), series['ds'].max(), freq='D')
+    y = series.set_index('ds')['y'].reindex(days, fill_value=0.0)
+    return pd.DataFrame({'ds': days, 'y': y.to_numpy()})
+
+
+def read_order_series(orders_path, products_path, dimensions, chunk_rows=100_000):
+    """
+    Agréger un export de commandes en séries journalières par segment
+    """
+    products = pd.read_csv(products_path, encoding="utf-8-sig", dtype={"Product ID": str})
+    products = products.set_index("Product ID")
+
+    totals = {}
+    usecols = ["Product ID"] + list(COLUMN_MAPPING)
+    reader = pd.read_csv(orders_path, encoding="utf-8-sig", dtype={"Product ID": str},
+                         usecols=lambda c: c in usecols, chunksize=chunk_rows)
+    with reader:
+        for chunk in reader:
+            chunk = normalize_columns(chunk)
+            ds = pd.to_datetime(chunk['ds']).dt.normalize()
+            y = pd.to_numeric(chunk['y'])
+            for dimension in dimensions:
+                values = chunk["Product ID"].map(products[SEGMENT_DIMENSIONS[dimension]])
+                chunk_totals = y.groupby([values.rename('value'), ds.rename('ds')]).sum()
+                previous = totals.get(dimension)
+                totals[dimension] = chunk_totals if previous is None else previous.add(chunk_totals, fill_value=0)
+
+    series = {}
+    for dimension, dimension_totals in totals.items():
+        for value, group in dimension_totals.reset_index(name='y').groupby('value'):
+            series[f"{dimension}:{value}"] = complete_days(group[['ds', 'y']])
+    return series
+
+
+def read_series_file(path):
+    """
+    Lire des séries déjà agrégées (colonnes segment, ds, y)
+    """
+    df = pd.read_csv(path, parse_dates=['ds'])
+    return {segment: complete_days(group[['ds', 'y']]) for segment, group in df.groupby('segment')}
+
+
+# État de chaque processus du pool : le modèle de référence, chargé une fois
+_template = None
+
+
+def _init_worker(template_path):
+    global _template
+    _template = load_template(template_path)
+    # Un logger déjà configuré n'est pas repassé en INFO par cmdstanpy
+    logger = logging.getLogger("cmdstanpy")
+    logger.addHandler(logging.StreamHandler())
+    logger.setLevel(logging.WARNING)
+
+
+def fit_segment(segment, series, output_path, slim=False):
+    """
+    Entraîner et sauvegarder le modèle d'un segment (dans un processus du pool)
+    """
+    start = time.perf_counter()
+    model = prophet_like(_template)
+    model.fit(add_regressors(series, include_target=False))
+    fit_seconds = time.perf_counter() - start
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    if slim:
+        export_artifact(model, output_path, horizon_days=config.FORECAST_TABLE_HORIZON_DAYS)
+    else:
+        tmp_path = output_path + ".tmp"
+        joblib.dump(model, tmp_path)
+        os.replace(tmp_path, output_path)
+    return segment, fit_seconds
+
+
+def write_manifest(model_dir, manifest):
+    """
+    Écriture atomique du manifeste (fichier temporaire puis renommage)
+    """
+    path = os.path.join(model_dir, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def train(series_by_segment, template_path, model_dir, version, workers=None, min_days=60, force=False,
+          slim=False):
+    """
+    Entraîner les segments dont les données ont changé et mettre à jour le manifeste
+    """
+    template = load_template(template_path)
+    signature = template_signature(template)
+    os.makedirs(model_dir, exist_ok=True)
+    manifest = load_manifest(model_dir)
+    manifest["version"] = version
+    entries = manifest.setdefault("segments", {})
+
+    artifact_format = "slim" if slim else "pickle"
+    jobs = {}
+    for segment, series in sorted(series_by_segment.items()):
+        input_hash = series_hash(series, signature)
+        entry = entries.get(segment)
+        if (not force and entry is not None and entry.get("input_hash") == input_hash
+                and entry.get("format", "pickle") == artifact_format
+                and os.path.exists(os.path.join(model_dir, entry["path"]))):
+            print(f"{segment}: inchangé, ignoré")
+            continue
+        if len(series) < min_days:
+            print(f"{segment}: {len(series)} jours seulement (minimum {min_days}), ignoré")
+            continue
+        dimension, _, value = segment.partition(":")
+        relative_path = os.path.join(version, dimension, slugify(value) if slim else f"{slugify(value)}.pkl")
+        jobs[segment] = (series, relative_path, input_hash)
+
+    print(f"{len(jobs)} segment(s) à entraîner sur {workers or os.cpu_count()} processus")
+    failures = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(template_path,)) as pool:
+        futures = {
+            pool.submit(fit_segment, segment, series, os.path.join(model_dir, relative_path), slim): segment
+            for segment, (series, relative_path, _) in jobs.items()
+        }
+        for future in as_completed(futures):
+            segment = futures[future]
+            series, relative_path, input_hash = jobs[segment]
+            try:
+                _, fit_seconds = future.result()
+            except Exception as e:
+                failures += 1
+                print(f"{segment}: échec de l'entraînement: {e}")
+                continue
+            entries[segment] = {
+                "path": relative_path,
+                "input_hash": input_hash,
+                "format": artifact_format,
+                "fit_seconds": round(fit_seconds, 3),
+                "days": len(series),
+                "start": series['ds'].min().strftime('%Y-%m-%d'),
+                "end": series['ds'].max().strftime('%Y-%m-%d'),
+                "version": version,
+                "trained_at": datetime.now().isoformat()
+            }
+            # Manifeste mis à jour après chaque segment pour pouvoir reprendre
+            write_manifest(model_dir, manifest)
+            print(f"{segment}: entraîné en {fit_seconds:.1f}s")
+
+    write_manifest(model_dir, manifest)
+    return manifest, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--orders", help="export des commandes (Product ID, Date Order was placed, Total Retail Price for This Order)")
+    source.add_argument("--series", help="séries journalières agrégées (segment, ds, y)")
+    parser.add_argument("--products", default=config.PRODUCT_SUPPLIER_CSV)
+    parser.add_argument("--dimensions", nargs="+", choices=list(SEGMENT_DIMENSIONS), default=list(SEGMENT_DIMENSIONS))
+    parser.add_argument("--template", default=config.MODEL_PATH, help="modèle dont la configuration est reprise")
+    parser.add_argument("--model-dir", default=config.MODEL_DIR)
+    parser.add_argument("--version", default=datetime.now().strftime("%Y%m%d-%H%M%S"))
+    parser.add_argument("--workers", type=int, default=None, help="défaut : nombre de cœurs")
+    parser.add_argument("--min-days", type=int, default=60)
+    parser.add_argument("--force", action="store_true", help="réentraîner même les segments inchangés")
+    parser.add_argument("--slim", action="store_true", help="écrire des artefacts allégés (voir artifact.py) au lieu de pickles")
+    args = parser.parse_args()
+
+    if args.orders:
+        series = read_order_series(args.orders, args.products, args.dimensions)
+    else:
+        series = read_series_file(args.series)
+
+    start = time.perf_counter()
+    manifest, failures = train(series, args.template, args.model_dir, args.version,
+                               workers=args.workers, min_days=args.min_days, force=args.force,
+                               slim=args.slim)
+    print(f"Terminé en {time.perf_counter() - start:.1f}s, {len(manifest['segments'])} segment(s) "
+          f"dans {os.path.join(args.model_dir, MANIFEST_NAME)}, {failures} échec(s)")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,11 @@
+import copy
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 
+from calendar_features import calendar_features
+from accuracy import error_metrics
+
 def create_future_dates(start_date: str, periods: int = 90):
     """
     Créer des dates futures pour la prédiction
@@ -15,14 +19,11 @@ def add_regressors(df, include_target=False):
     Ajouter les régresseurs temporels
     """
     df = df.copy()
-    df['day_of_week'] = df['ds'].dt.dayofweek
-    df['day_of_month'] = df['ds'].dt.day
-    df['week_of_year'] = df['ds'].dt.isocalendar().week
-    df['month'] = df['ds'].dt.month
-    df['quarter'] = df['ds'].dt.quarter
-    df['is_weekend'] = (df['ds'].dt.dayofweek >= 5).astype(int)
-    df['is_month_start'] = (df['ds'].dt.day <= 7).astype(int)
-    df['is_month_end'] = (df['ds'].dt.day >= 24).astype(int)
+    # Variables calendaires lues dans la table précalculée (cf. calendar_features)
+    calendar = calendar_features(df['ds'])
+    for name in ['day_of_week', 'day_of_month', 'week_of_year', 'month', 'quarter',
+                 'is_weekend', 'is_month_start', 'is_month_end']:
+        df[name] = calendar[name]
     
     # Ces colonnes nécessitent la variable cible : Moving Averages & Lags
     if include_target and 'y' in df.columns:
@@ -43,27 +44,31 @@ def add_regressors(df, include_target=False):
                 df[col].fillna(df[col].mean(), inplace=True)
     
     # Saisons et événements
-    df['is_summer'] = df['month'].isin([6, 7, 8]).astype(int)
-    df['is_christmas_season'] = df['month'].isin([11, 12]).astype(int)
-    df['is_back_to_school'] = (
-        (df['month'] == 8) | 
-        ((df['month'] == 9) & (df['day_of_month'] <= 15))
-    ).astype(int)
+    for name in ['is_summer', 'is_christmas_season', 'is_back_to_school']:
+        df[name] = calendar[name]
     
     return df
 
+def model_for_interval_mode(model, interval_mode="full", fast_samples=100):
+    """
+    Adapter le nombre d'échantillons d'incertitude du modèle au mode demandé.
+    Le modèle partagé n'est jamais modifié : on travaille sur une copie légère.
+    """
+    if interval_mode == "full":
+        return model
+    if interval_mode == "none":
+        samples = 0
+    elif interval_mode == "fast":
+        samples = min(fast_samples, model.uncertainty_samples or 0)
+    else:
+        raise ValueError(f"Mode d'intervalle inconnu: {interval_mode}")
+    light_model = copy.copy(model)
+    light_model.uncertainty_samples = samples
+    return light_model
+
 def calculate_metrics(y_true, y_pred):
     """
-    Calculer les métriques de performance
+    Calculer les métriques de performance (MAE, RMSE, R2, MAPE, sMAPE, Bias)
+    en une passe, voir accuracy.py
     """
-    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-    
-    mae = mean_absolute_error(y_true, y_pred)
-    rmse = np.sqrt(mean_squared_error(y_true, y_pred))
-    r2 = r2_score(y_true, y_pred)
-    
-    return {
-        'MAE': float(mae),
-        'RMSE': float(rmse),
-        'R2': float(r2)
-    }
\ No newline at end of file
+    return error_metrics(y_true, y_pred)
@@ -3,8 +3,10 @@ import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 import requests
+from requests.adapters import HTTPAdapter
 import io
-import base64
+import uuid
+import zlib
 from datetime import datetime, timedelta
 from PIL import Image
 
@@ -21,6 +23,25 @@ st.set_page_config(
 
 API_URL = "http://localhost:8000"
 
+# Délais (connexion, lecture) en secondes : la lecture couvre une prédiction complète
+API_TIMEOUT = (3, 120)
+HEALTH_TIMEOUT = (2, 5)
+# Durée de vie des réponses mémorisées entre deux rafraîchissements de la page
+HEALTH_TTL_SECONDS = 30
+NEXT_MONTHS_TTL_SECONDS = 300
+
+# Envoi des fichiers CSV : lignes lues pour l'aperçu, taille des blocs
+# compressés et envoyés au fil de l'eau, lignes par morceau pour l'agrégation
+PREVIEW_ROWS = 5
+# Points par série demandés au backend pour les graphiques (réduction LTTB)
+CHART_MAX_POINTS = 1000
+UPLOAD_CHUNK_BYTES = 1 << 20
+AGGREGATE_CHUNK_ROWS = 200_000
+
+# Noms de colonnes acceptés par le backend
+DATE_COLUMNS = ("Date Order was placed", "date")
+SALES_COLUMNS = ("Total Retail Price for This Order", "sales")
+
 # 🎨 Styles globaux modernisés
 st.markdown("""
 <style>
@@ -315,12 +336,211 @@ with st.sidebar:
 page = st.session_state["page"]
 
 # Fonctions utilitaires
+@st.cache_resource
+def get_session():
+    """
+    Session HTTP partagée par toutes les exécutions du script : les
+    connexions au backend sont réutilisées (keep-alive) au lieu d'être
+    rouvertes à chaque clic
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+@st.cache_data(ttl=HEALTH_TTL_SECONDS, show_spinner=False)
+def fetch_health():
+    """
+    État du backend (/health). Un backend injoignable ou en erreur lève une
+    exception, qui n'est donc pas mise en cache : le prochain affichage
+    réessaie au lieu de garder l'échec pendant HEALTH_TTL_SECONDS.
+    """
+    response = get_session().get(f"{API_URL}/health", timeout=HEALTH_TIMEOUT)
+    if response.status_code != 200:
+        raise requests.HTTPError(f"Erreur API: {response.status_code}", response=response)
+    return response.json()
+
+def current_health():
+    """
+    État du backend, ou None s'il est injoignable
+    """
+    try:
+        return fetch_health()
+    except (requests.RequestException, ValueError):
+        return None
+
+@st.cache_data(ttl=NEXT_MONTHS_TTL_SECONDS, show_spinner=False)
+def fetch_next_months():
+    """
+    Prédiction des 3 prochains mois : (corps JSON, Server-Timing).
+    Une erreur HTTP lève une exception et n'est donc pas mise en cache.
+    """
+    response = get_session().post(f"{API_URL}/predict-next-months", timeout=API_TIMEOUT)
+    if response.status_code != 200:
+        raise requests.HTTPError(f"Erreur API: {response.status_code}", response=response)
+    return response.json(), response.headers.get("Server-Timing")
+
 def check_api_connection():
+    return current_health() is not None
+
+def csv_compression(filename):
+    return "gzip" if filename.lower().endswith(".gz") else None
+
+def read_preview(uploaded_file, rows=PREVIEW_ROWS):
+    """
+    Aperçu des premières lignes seulement, sans lire tout le fichier
+    """
+    uploaded_file.seek(0)
     try:
-        response = requests.get(f"{API_URL}/health")
-        return response.status_code == 200
-    except:
-        return False
+        return pd.read_csv(uploaded_file, nrows=rows, compression=csv_compression(uploaded_file.name))
+    finally:
+        uploaded_file.seek(0)
+
+def gzip_chunks(fileobj, chunk_bytes=UPLOAD_CHUNK_BYTES):
+    """
+    Compresser un fichier en gzip bloc par bloc
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    while True:
+        block = fileobj.read(chunk_bytes)
+        if not block:
+            break
+        compressed = compressor.compress(block)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def daily_totals_csv(uploaded_file, chunk_rows=AGGREGATE_CHUNK_ROWS):
+    """
+    Agréger le fichier en ventes totales par jour (colonnes date, sales),
+    morceau par morceau ; renvoie le CSV obtenu et le nombre de jours
+    """
+    uploaded_file.seek(0)
+    totals = None
+    with pd.read_csv(uploaded_file, usecols=lambda column: column in DATE_COLUMNS + SALES_COLUMNS,
+                     chunksize=chunk_rows, encoding="utf-8-sig",
+                     compression=csv_compression(uploaded_file.name)) as reader:
+        for chunk in reader:
+            date_column = next((c for c in DATE_COLUMNS if c in chunk.columns), None)
+            sales_column = next((c for c in SALES_COLUMNS if c in chunk.columns), None)
+            if date_column is None or sales_column is None:
+                raise ValueError("Colonnes de date ou de ventes introuvables")
+            ds = pd.to_datetime(chunk[date_column]).dt.normalize()
+            chunk_totals = pd.to_numeric(chunk[sales_column]).groupby(ds).sum()
+            totals = chunk_totals if totals is None else totals.add(chunk_totals, fill_value=0)
+    uploaded_file.seek(0)
+    if totals is None or totals.empty:
+        raise ValueError("Le fichier ne contient aucune ligne")
+    totals = totals.sort_index()
+    daily = pd.DataFrame({"date": totals.index.strftime("%Y-%m-%d"), "sales": totals.to_numpy()})
+    return daily.to_csv(index=False).encode(), len(daily)
+
+def multipart_stream(field, filename, chunks, content_type="application/octet-stream"):
+    """
+    Corps multipart/form-data produit au fil de l'eau : requests l'envoie
+    en Transfer-Encoding chunked, sans le garder entier en mémoire.
+    Renvoie (générateur du corps, en-tête Content-Type).
+    """
+    boundary = uuid.uuid4().hex
+
+    def body():
+        yield (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode()
+        yield from chunks
+        yield f"\r\n--{boundary}--\r\n".encode()
+
+    return body(), f"multipart/form-data; boundary={boundary}"
+
+def upload_csv(uploaded_file, aggregate=False, params=None):
+    """
+    Envoyer un CSV à /predict-csv, compressé en gzip (sauf s'il l'est déjà)
+    ou préalablement agrégé par jour
+    """
+    if aggregate:
+        content, _ = daily_totals_csv(uploaded_file)
+        chunks = gzip_chunks(io.BytesIO(content))
+    elif csv_compression(uploaded_file.name):
+        uploaded_file.seek(0)
+        chunks = iter(lambda: uploaded_file.read(UPLOAD_CHUNK_BYTES), b"")
+    else:
+        uploaded_file.seek(0)
+        chunks = gzip_chunks(uploaded_file)
+    filename = uploaded_file.name if uploaded_file.name.lower().endswith(".gz") else f"{uploaded_file.name}.gz"
+    body, content_type = multipart_stream("file", filename, chunks, "application/gzip")
+    return get_session().post(
+        f"{API_URL}/predict-csv", data=body, params=params,
+        headers={"Content-Type": content_type}, timeout=API_TIMEOUT
+    )
+
+def parse_server_timing(header):
+    """
+    Décoder l'en-tête Server-Timing du backend ("étape;dur=ms, ...")
+    """
+    stages = []
+    for entry in (header or "").split(","):
+        parts = entry.strip().split(";")
+        duration = next((p[4:] for p in parts[1:] if p.strip().startswith("dur=")), None)
+        if parts[0] and duration is not None:
+            try:
+                stages.append({"Étape": parts[0], "Durée (ms)": float(duration)})
+            except ValueError:
+                pass
+    return pd.DataFrame(stages, columns=["Étape", "Durée (ms)"])
+
+def display_server_timing(header):
+    """
+    Détail du temps passé par le backend sur chaque étape de la requête
+    """
+    timings = parse_server_timing(header)
+    if timings.empty:
+        return
+    total = timings.loc[timings["Étape"] == "total", "Durée (ms)"]
+    stages = timings[timings["Étape"] != "total"]
+    label = f"⏱️ Temps de traitement : {total.iloc[0]:.0f} ms" if not total.empty else "⏱️ Temps de traitement"
+    with st.expander(label):
+        fig = px.bar(stages, x="Durée (ms)", y="Étape", orientation="h")
+        fig.update_layout(height=60 + 30 * len(stages), margin=dict(l=0, r=0, t=10, b=0))
+        st.plotly_chart(fig, use_container_width=True)
+
+def chart_figure(chart):
+    """
+    Graphique Plotly construit à partir des séries renvoyées par le backend (chart=true)
+    """
+    forecast = chart["forecast"]
+    fig = go.Figure()
+    if "predicted_lower" in forecast and "predicted_upper" in forecast:
+        fig.add_trace(go.Scatter(
+            x=forecast["date"], y=forecast["predicted_upper"],
+            mode="lines", line=dict(width=0), showlegend=False, hoverinfo="skip"
+        ))
+        fig.add_trace(go.Scatter(
+            x=forecast["date"], y=forecast["predicted_lower"],
+            mode="lines", line=dict(width=0), fill="tonexty", fillcolor="rgba(99,102,241,0.22)",
+            name="Intervalle de confiance"
+        ))
+    fig.add_trace(go.Scatter(
+        x=forecast["date"], y=forecast["predicted_sales"],
+        mode="lines", name="Prédiction", line=dict(color="#6366F1", width=2)
+    ))
+    actual = chart.get("actual")
+    if actual:
+        fig.add_trace(go.Scatter(
+            x=actual["date"], y=actual["actual_sales"],
+            mode="markers", name="Ventes réelles", marker=dict(color="#10B981", size=5, opacity=0.6)
+        ))
+    fig.update_layout(
+        title=chart.get("title"),
+        xaxis_title="Date",
+        yaxis_title="Ventes (€)",
+        hovermode="x unified",
+        template="plotly_white",
+        height=500
+    )
+    return fig
 
 def display_metrics(metrics_data):
     if metrics_data:
@@ -548,90 +768,91 @@ elif page == "📊 Prédiction Automatique":
     if st.button("🔮 Générer la prédiction"):
         with st.spinner("Génération des prédictions..."):
             try:
-                response = requests.post(f"{API_URL}/predict-next-months")
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get("success"):
-                        predictions = data.get("monthly_predictions", [])
-                        df_pred = pd.DataFrame(predictions)
-
-                        col1, col2, col3 = st.columns(3)
-                        with col1:
-                            total_pred = df_pred['predicted_sales'].sum()
-                            st.metric("Total prédit (3 mois)", f"{total_pred:,.0f} €")
-                        with col2:
-                            avg_monthly = df_pred['predicted_sales'].mean()
-                            st.metric("Moyenne mensuelle", f"{avg_monthly:,.0f} €")
-                        with col3:
-                            max_month = df_pred.loc[df_pred['predicted_sales'].idxmax(), 'month']
-                            st.metric("Meilleur mois", max_month)
-
-                        fig = go.Figure()
-                        fig.add_trace(go.Bar(
+                data, server_timing = fetch_next_months()
+                if data.get("success"):
+                    display_server_timing(server_timing)
+                    predictions = data.get("monthly_predictions", [])
+                    df_pred = pd.DataFrame(predictions)
+
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        total_pred = df_pred['predicted_sales'].sum()
+                        st.metric("Total prédit (3 mois)", f"{total_pred:,.0f} €")
+                    with col2:
+                        avg_monthly = df_pred['predicted_sales'].mean()
+                        st.metric("Moyenne mensuelle", f"{avg_monthly:,.0f} €")
+                    with col3:
+                        max_month = df_pred.loc[df_pred['predicted_sales'].idxmax(), 'month']
+                        st.metric("Meilleur mois", max_month)
+
+                    fig = go.Figure()
+                    fig.add_trace(go.Bar(
+                        x=df_pred['month'],
+                        y=df_pred['predicted_sales'],
+                        name='Ventes prédites',
+                        marker_color='#6366F1',
+                        text=df_pred['predicted_sales'].apply(lambda x: f"{x:,.0f}€"),
+                        textposition='auto',
+                    ))
+
+                    if 'predicted_range' in df_pred.columns:
+                        lower_vals = [r['lower'] for r in df_pred['predicted_range']]
+                        upper_vals = [r['upper'] for r in df_pred['predicted_range']]
+
+                        fig.add_trace(go.Scatter(
+                            x=df_pred['month'],
+                            y=upper_vals,
+                            mode='lines',
+                            line=dict(width=0),
+                            showlegend=False,
+                            hoverinfo='skip'
+                        ))
+                        fig.add_trace(go.Scatter(
                             x=df_pred['month'],
-                            y=df_pred['predicted_sales'],
-                            name='Ventes prédites',
-                            marker_color='#6366F1',
-                            text=df_pred['predicted_sales'].apply(lambda x: f"{x:,.0f}€"),
-                            textposition='auto',
+                            y=lower_vals,
+                            mode='lines',
+                            line=dict(width=0),
+                            fillcolor='rgba(99,102,241,0.22)',
+                            fill='tonexty',
+                            showlegend=False,
+                            hoverinfo='skip'
                         ))
 
-                        if 'predicted_range' in df_pred.columns:
-                            lower_vals = [r['lower'] for r in df_pred['predicted_range']]
-                            upper_vals = [r['upper'] for r in df_pred['predicted_range']]
-
-                            fig.add_trace(go.Scatter(
-                                x=df_pred['month'],
-                                y=upper_vals,
-                                mode='lines',
-                                line=dict(width=0),
-                                showlegend=False,
-                                hoverinfo='skip'
-                            ))
-                            fig.add_trace(go.Scatter(
-                                x=df_pred['month'],
-                                y=lower_vals,
-                                mode='lines',
-                                line=dict(width=0),
-                                fillcolor='rgba(99,102,241,0.22)',
-                                fill='tonexty',
-                                showlegend=False,
-                                hoverinfo='skip'
-                            ))
-
-                        fig.update_layout(
-                            title='Prédiction des Ventes - 3 prochains mois',
-                            xaxis_title='Mois',
-                            yaxis_title='Ventes prédites (€)',
-                            hovermode='x unified',
-                            template='plotly_white',
-                            height=500
+                    fig.update_layout(
+                        title='Prédiction des Ventes - 3 prochains mois',
+                        xaxis_title='Mois',
+                        yaxis_title='Ventes prédites (€)',
+                        hovermode='x unified',
+                        template='plotly_white',
+                        height=500
+                    )
+
+                    st.plotly_chart(fig, use_container_width=True)
+
+                    st.markdown("### 📋 Détails des prédictions")
+                    display_df = df_pred.copy()
+                    display_df['predicted_sales'] = display_df['predicted_sales'].apply(lambda x: f"{x:,.0f} €")
+                    if 'predicted_range' in display_df.columns:
+                        display_df['intervalle'] = display_df['predicted_range'].apply(
+                            lambda x: f"{x['lower']:,.0f} - {x['upper']:,.0f} €"
                         )
+                        display_df = display_df[['month', 'predicted_sales', 'intervalle']]
 
-                        st.plotly_chart(fig, use_container_width=True)
-
-                        st.markdown("### 📋 Détails des prédictions")
-                        display_df = df_pred.copy()
-                        display_df['predicted_sales'] = display_df['predicted_sales'].apply(lambda x: f"{x:,.0f} €")
-                        if 'predicted_range' in display_df.columns:
-                            display_df['intervalle'] = display_df['predicted_range'].apply(
-                                lambda x: f"{x['lower']:,.0f} - {x['upper']:,.0f} €"
-                            )
-                            display_df = display_df[['month', 'predicted_sales', 'intervalle']]
-
-                        st.dataframe(display_df, use_container_width=True)
-
-                        csv = df_pred.to_csv(index=False)
-                        st.download_button(
-                            label="📥 Télécharger les prédictions (CSV)",
-                            data=csv,
-                            file_name=f"predictions_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                            mime="text/csv"
-                        )
-                    else:
-                        st.error(f"Erreur: {data.get('error', 'Erreur inconnue')}")
+                    st.dataframe(display_df, use_container_width=True)
+
+                    csv = df_pred.to_csv(index=False)
+                    st.download_button(
+                        label="📥 Télécharger les prédictions (CSV)",
+                        data=csv,
+                        file_name=f"predictions_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                        mime="text/csv"
+                    )
                 else:
-                    st.error(f"Erreur API: {response.status_code}")
+                    # Ne pas garder un échec en cache jusqu'à l'expiration du TTL
+                    fetch_next_months.clear()
+                    st.error(f"Erreur: {data.get('error', 'Erreur inconnue')}")
+            except requests.HTTPError as e:
+                st.error(str(e))
             except Exception as e:
                 st.error(f"Erreur: {str(e)}")
 
@@ -650,33 +871,39 @@ elif page == "📁 Upload CSV":
         "- Format date : `YYYY-MM-DD`"
     )
 
-    uploaded_file = st.file_uploader("Choisissez un fichier CSV", type=["csv"])
+    uploaded_file = st.file_uploader("Choisissez un fichier CSV", type=["csv", "gz"])
 
     if uploaded_file is not None:
         try:
-            df = pd.read_csv(uploaded_file)
+            df = read_preview(uploaded_file)
             st.success(f"✅ Fichier chargé : {uploaded_file.name}")
             st.markdown("### Aperçu des données")
-            st.dataframe(df.head(), use_container_width=True)
+            st.dataframe(df, use_container_width=True)
 
             col1, col2 = st.columns(2)
             with col1:
                 predict_button = st.button("🚀 Lancer la prédiction", use_container_width=True)
             with col2:
                 show_stats = st.checkbox("Afficher les statistiques", value=True)
+                aggregate = st.checkbox(
+                    "Agréger par jour avant l'envoi", value=False,
+                    help="Envoie seulement les ventes totales par jour : recommandé pour les gros exports"
+                )
 
             if predict_button:
                 with st.spinner("Analyse en cours..."):
                     try:
-                        files = {"file": (uploaded_file.name, uploaded_file.getvalue(), "text/csv")}
-                        response = requests.post(f"{API_URL}/predict-csv", files=files)
+                        response = upload_csv(
+                            uploaded_file, aggregate=aggregate,
+                            params={"chart": "true", "max_points": CHART_MAX_POINTS}
+                        )
 
                         if response.status_code == 200:
                             data = response.json()
                             if data.get("success"):
-                                if data.get("plot"):
-                                    plot_data = base64.b64decode(data["plot"])
-                                    st.image(plot_data, caption="Prédictions vs Réelles")
+                                display_server_timing(response.headers.get("Server-Timing"))
+                                if data.get("chart"):
+                                    st.plotly_chart(chart_figure(data["chart"]), use_container_width=True)
 
                                 if show_stats and data.get("metrics"):
                                     st.markdown("### 📊 Métriques de performance")
@@ -745,15 +972,17 @@ elif page == "⚙️ Paramètres Avancés":
                     "start_date": start_date.strftime('%Y-%m-%d'),
                     "periods": periods
                 }
-                response = requests.post(f"{API_URL}/predict", json=request_data)
+                response = get_session().post(
+                    f"{API_URL}/predict", json=request_data,
+                    params={"chart": "true", "max_points": CHART_MAX_POINTS}, timeout=API_TIMEOUT
+                )
 
                 if response.status_code == 200:
                     data = response.json()
                     if data.get("success"):
-                        if data.get("plot_data"):
-                            plot_base64 = data["plot_data"]["plot"]
-                            plot_data = base64.b64decode(plot_base64)
-                            st.image(plot_data, caption=f"Prédiction pour {periods} jours")
+                        display_server_timing(response.headers.get("Server-Timing"))
+                        if data.get("chart"):
+                            st.plotly_chart(chart_figure(data["chart"]), use_container_width=True)
 
                         predictions = data.get("predictions", [])
                         if predictions:
@@ -768,19 +997,17 @@ elif page == "⚙️ Paramètres Avancés":
                 st.error(f"Erreur: {str(e)}")
 
     st.markdown("### 🧩 Informations système")
-    try:
-        response = requests.get(f"{API_URL}/health")
-        if response.status_code == 200:
-            health_data = response.json()
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("Statut API", "✅ En ligne" if health_data.get("model_loaded") else "⚠️ Partiel")
-            with col2:
-                st.metric("Modèle", "✅ Chargé" if health_data.get("model_loaded") else "❌ Absent")
-            with col3:
-                last_update = health_data.get("timestamp", "").split("T")[0]
-                st.metric("Dernière vérification", last_update)
-    except:
+    health_data = current_health()
+    if health_data is not None:
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Statut API", "✅ En ligne" if health_data.get("model_loaded") else "⚠️ Partiel")
+        with col2:
+            st.metric("Modèle", "✅ Chargé" if health_data.get("model_loaded") else "❌ Absent")
+        with col3:
+            last_update = health_data.get("timestamp", "").split("T")[0]
+            st.metric("Dernière vérification", last_update)
+    else:
         st.warning("Impossible de récupérer les informations système")
 
 # 🦶 Pied de page